@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RideConfig(AppConfig):
     name = 'ride'
+
+    def ready(self):
+        import ride.signals  # noqa: F401
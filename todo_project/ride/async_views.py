@@ -0,0 +1,54 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from ride.fast_serializer import InvalidFieldset
+from ride.services import RideService
+from ride.views import InvalidDatetime, parse_list_params, parse_duration_params
+from user.authentication import CookieOnlyAdminAuthentication
+from user.permissions import IsAdminRole
+from todo_project.pagination import InvalidCursor, paginated_response_body
+
+
+async def _authorize(request):
+    """Same checks as RideViewSet (Cookie token + admin role); returns an error response or None."""
+    authenticator = CookieOnlyAdminAuthentication()
+    try:
+        user, _ = await sync_to_async(authenticator.authenticate)(request)
+    except AuthenticationFailed as e:
+        response = JsonResponse({'detail': str(e.detail)}, status=401)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return response
+    
+    request.user = user
+    if not IsAdminRole().has_permission(request, None):
+        return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+    return None
+
+
+@require_GET
+async def ride_list(request):
+    error = await _authorize(request)
+    if error:
+        return error
+    
+    try:
+        result = await RideService.aget_filtered_and_sorted_rides(**parse_list_params(request.GET))
+    except (InvalidCursor, InvalidDatetime, InvalidFieldset) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    return JsonResponse(paginated_response_body(request.GET, result, result['results']))
+
+
+@require_GET
+async def ride_with_duration(request):
+    error = await _authorize(request)
+    if error:
+        return error
+    
+    try:
+        result = await RideService.aget_rides_with_duration(**parse_duration_params(request.GET))
+    except (InvalidCursor, InvalidFieldset) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    return JsonResponse(paginated_response_body(request.GET, result, result['results']))
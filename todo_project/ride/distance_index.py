@@ -0,0 +1,227 @@
+import heapq
+import threading
+import time
+from array import array
+from math import radians, cos, sin
+from typing import Iterable, List, Optional, Set, Tuple
+from ride.models import Ride
+
+
+class RideDistanceIndex:
+    """
+    Column-oriented, in-process copy of the ride fields needed for distance sorting.
+
+    Pickup coordinates are stored pre-converted to radians together with cos(latitude),
+    so a distance query only evaluates the parts of the haversine formula that depend
+    on the request point. New rides are appended by id, rides touched by signals are
+    re-read on the next query, and a full rebuild happens every `full_refresh_seconds`
+    to pick up writes made by other processes. Until then the status and rider columns
+    may lag behind such writes, so callers re-check their filters in SQL (see
+    RideService.get_filtered_and_sorted_rides).
+    """
+
+    def __init__(self, full_refresh_seconds: int = 300):
+        self.full_refresh_seconds = full_refresh_seconds
+        self._lock = threading.Lock()
+        # Held while a full rebuild reads the table, so only one thread does it.
+        self._rebuild_lock = threading.Lock()
+        # Held while new and dirty rows are read and applied, so an older read never overwrites a newer one.
+        self._update_lock = threading.Lock()
+        self._invalidations = 0
+        self._reset()
+
+    def _reset(self):
+        self._ids = array('q')
+        self._rider_ids = array('q')
+        self._statuses: List[str] = []
+        self._lat_rad = array('d')
+        self._lon_rad = array('d')
+        self._cos_lat = array('d')
+        self._positions = {}
+        self._max_id = 0
+        self._dirty_ids: Set[int] = set()
+        self._loaded_at = None
+
+    @staticmethod
+    def _rows(queryset) -> Iterable[Tuple]:
+        return queryset.values_list(
+            'id_ride', 'status', 'id_rider_id', 'pickup_latitude', 'pickup_longitude'
+        ).iterator(chunk_size=5000)
+
+    def _append(self, id_ride, status, id_rider, lat, lon):
+        lat_rad = radians(lat)
+        self._positions[id_ride] = len(self._ids)
+        self._ids.append(id_ride)
+        self._rider_ids.append(id_rider)
+        self._statuses.append(status)
+        self._lat_rad.append(lat_rad)
+        self._lon_rad.append(radians(lon))
+        self._cos_lat.append(cos(lat_rad))
+        if id_ride > self._max_id:
+            self._max_id = id_ride
+
+    def _overwrite(self, pos, status, id_rider, lat, lon):
+        lat_rad = radians(lat)
+        self._rider_ids[pos] = id_rider
+        self._statuses[pos] = status
+        self._lat_rad[pos] = lat_rad
+        self._lon_rad[pos] = radians(lon)
+        self._cos_lat[pos] = cos(lat_rad)
+
+    def _remove(self, id_ride):
+        pos = self._positions.pop(id_ride, None)
+        if pos is None:
+            return
+        last = len(self._ids) - 1
+        if pos != last:
+            moved_id = self._ids[last]
+            self._ids[pos] = moved_id
+            self._rider_ids[pos] = self._rider_ids[last]
+            self._statuses[pos] = self._statuses[last]
+            self._lat_rad[pos] = self._lat_rad[last]
+            self._lon_rad[pos] = self._lon_rad[last]
+            self._cos_lat[pos] = self._cos_lat[last]
+            self._positions[moved_id] = pos
+        for column in (self._ids, self._rider_ids, self._statuses, self._lat_rad, self._lon_rad, self._cos_lat):
+            column.pop()
+
+    def size(self) -> int:
+        """Number of rides in the index (as of the last refresh)."""
+        with self._lock:
+            return len(self._ids)
+
+    def mark_dirty(self, id_ride: int):
+        with self._lock:
+            self._dirty_ids.add(id_ride)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+            self._invalidations += 1
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.full_refresh_seconds
+
+    def _rebuild(self, rides, wait: bool):
+        """
+        Load the whole table into a new index without holding the lock, then swap it in.
+
+        While another thread rebuilds, queries keep using the current columns unless `wait`
+        (there are none, or they were invalidated).
+        """
+        if not self._rebuild_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                if not self._is_stale():
+                    # Another thread rebuilt while this one waited.
+                    return
+                invalidations = self._invalidations
+            loaded_at = time.monotonic()
+            fresh = RideDistanceIndex(self.full_refresh_seconds)
+            for row in self._rows(rides.order_by('id_ride')):
+                fresh._append(*row)
+            with self._lock:
+                # Rides marked dirty meanwhile stay dirty: re-reading them is harmless.
+                for name in ('_ids', '_rider_ids', '_statuses', '_lat_rad', '_lon_rad', '_cos_lat', '_positions', '_max_id'):
+                    setattr(self, name, getattr(fresh, name))
+                # Invalidated during the load: use these columns, but rebuild on the next query.
+                self._loaded_at = loaded_at if self._invalidations == invalidations else None
+        finally:
+            self._rebuild_lock.release()
+
+    def refresh(self):
+        """Bring the index up to date: full rebuild when stale, then only new and dirty rides."""
+        # Always read the primary: dirty ids are consumed once, so a lagging read replica
+        # would leave the index permanently behind.
+        rides = Ride.objects.using('default')
+        with self._lock:
+            stale = self._is_stale()
+            wait = self._loaded_at is None
+        if stale:
+            self._rebuild(rides, wait)
+
+        # The rows are read without holding `_lock`, so queries keep being served meanwhile.
+        with self._update_lock:
+            with self._lock:
+                dirty_ids = self._dirty_ids
+                self._dirty_ids = set()
+                max_id = self._max_id
+            try:
+                dirty_rows = list(self._rows(rides.filter(id_ride__in=dirty_ids))) if dirty_ids else []
+                new_rows = list(self._rows(rides.filter(id_ride__gt=max_id).order_by('id_ride')))
+            except Exception:
+                with self._lock:
+                    self._dirty_ids |= dirty_ids
+                raise
+
+            with self._lock:
+                seen = set()
+                for id_ride, status, id_rider, lat, lon in dirty_rows:
+                    seen.add(id_ride)
+                    pos = self._positions.get(id_ride)
+                    if pos is None:
+                        self._append(id_ride, status, id_rider, lat, lon)
+                    else:
+                        self._overwrite(pos, status, id_rider, lat, lon)
+                for id_ride in dirty_ids - seen:
+                    self._remove(id_ride)
+                for row in new_rows:
+                    if row[0] not in self._positions:
+                        self._append(*row)
+
+    def _candidate_positions(self, status: Optional[str], rider_ids: Optional[Set[int]],
+                             ride_ids: Optional[Set[int]]) -> Iterable[int]:
+        if ride_ids is not None:
+            positions = sorted(self._positions[id_ride] for id_ride in ride_ids if id_ride in self._positions)
+        else:
+            positions = range(len(self._ids))
+        if status:
+            statuses = self._statuses
+            positions = [i for i in positions if statuses[i] == status]
+        if rider_ids is not None:
+            rider_column = self._rider_ids
+            positions = [i for i in positions if rider_column[i] in rider_ids]
+        return positions
+
+    def nearest(self, lat: float, lon: float, offset: int, limit: int, descending: bool = False,
+                status: str = None, rider_ids: Optional[Set[int]] = None,
+                ride_ids: Optional[Set[int]] = None) -> Tuple[List[int], int]:
+        """
+        Return (ride ids for the requested page, total matching rides).
+
+        Distances for all candidates are computed in one pass over the columns and only
+        `offset + limit` of them are kept by a bounded heap selection instead of a full sort.
+        """
+        self.refresh()
+
+        with self._lock:
+            positions = self._candidate_positions(status, rider_ids, ride_ids)
+            total_count = len(positions)
+            if offset >= total_count or limit <= 0:
+                return [], total_count
+
+            lat1 = radians(lat)
+            lon1 = radians(lon)
+            cos_lat1 = cos(lat1)
+            ids = self._ids
+            lat_rad = self._lat_rad
+            lon_rad = self._lon_rad
+            cos_lat = self._cos_lat
+
+            # sin^2(dlat/2) + cos(lat1) * cos(lat2) * sin^2(dlon/2) grows monotonically with the
+            # great-circle distance, so ranking does not need the asin/sqrt step.
+            scored = (
+                (sin((lat_rad[i] - lat1) / 2) ** 2 + cos_lat1 * cos_lat[i] * sin((lon_rad[i] - lon1) / 2) ** 2, ids[i])
+                for i in positions
+            )
+            k = offset + limit
+            if descending:
+                top = heapq.nlargest(k, scored, key=lambda item: (item[0], -item[1]))
+            else:
+                top = heapq.nsmallest(k, scored)
+
+        return [id_ride for _, id_ride in top[offset:]], total_count
+
+
+ride_distance_index = RideDistanceIndex()
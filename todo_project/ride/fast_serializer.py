@@ -0,0 +1,237 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework import serializers
+from ride.serializers import RideSerializer
+from ride_event.models import RideEvent, RideEventArchive
+from ride_event.serializers import RideEventSerializer
+
+
+class InvalidFieldset(ValueError):
+    pass
+
+
+class RideShape:
+    """
+    A compiled `?fields=`/`?expand=` selection: the render plan and the `values()` columns it needs.
+
+    Relations that are not expanded render as their primary key, which values() reads from the ride
+    row itself, so they are never joined; without `todays_ride_events` no events query runs.
+    """
+
+    __slots__ = ('key', 'plan', 'values_fields', 'events')
+
+    def __init__(self, key: str, plan: tuple, values_fields: tuple, events: bool):
+        self.key = key
+        self.plan = plan
+        self.values_fields = values_fields
+        self.events = events
+
+
+class RideFastSerializer:
+    """
+    Produces the same JSON shape as RideSerializer from `values()` rows.
+
+    The field layout (order, nesting and per-field converters) is read from RideSerializer
+    once and compiled into flat tuples, so serializing a page is a loop over plain dicts plus
+    one batched query for the rides' events of the last 24 hours.
+    """
+
+    EVENTS_FIELD = 'todays_ride_events'
+    # Always fetched: events are grouped by id_ride and cursors are built from pickup_time.
+    KEY_FIELDS = ('id_ride', 'pickup_time')
+
+    _ride_plan = None
+    _event_plan = None
+    _values_fields = None
+    _relations = None
+    _shapes = {}
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.RelatedField):
+            # values() already yields the related primary key.
+            return None
+        if isinstance(field, (serializers.IntegerField, serializers.CharField)) and not isinstance(field, serializers.ChoiceField):
+            return None
+        return field.to_representation
+
+    @classmethod
+    def _compile(cls):
+        ride_plan = []
+        values_fields = []
+        relations = {}
+        for name, field in RideSerializer().fields.items():
+            if field.write_only:
+                continue
+            if name == cls.EVENTS_FIELD:
+                ride_plan.append((name, None, None))
+            elif isinstance(field, serializers.BaseSerializer):
+                nested = []
+                for nested_name, nested_field in field.fields.items():
+                    if nested_field.write_only:
+                        continue
+                    source = f'{field.source}__{nested_field.source}'
+                    values_fields.append(source)
+                    nested.append((nested_name, source, cls._converter(nested_field)))
+                ride_plan.append((name, tuple(nested), None))
+                relations[name] = field.source
+            else:
+                values_fields.append(field.source)
+                ride_plan.append((name, field.source, cls._converter(field)))
+
+        event_plan = []
+        for name, field in RideEventSerializer().fields.items():
+            event_plan.append((name, field.source, cls._converter(field)))
+
+        cls._values_fields = tuple(values_fields)
+        cls._event_plan = tuple(event_plan)
+        cls._relations = relations
+        cls._ride_plan = tuple(ride_plan)
+        cls._shapes = {(None, None): RideShape('full', cls._ride_plan, cls._values_fields, True)}
+
+    @classmethod
+    def values_fields(cls, shape: RideShape = None, extra: Iterable[str] = ()) -> tuple:
+        if cls._ride_plan is None:
+            cls._compile()
+        fields = shape.values_fields if shape is not None else cls._values_fields
+        missing = tuple(name for name in extra if name not in fields)
+        return fields + missing if missing else fields
+
+    @classmethod
+    def shape(cls, fields: Iterable[str] = None, expand: Iterable[str] = None) -> RideShape:
+        """
+        The response shape for `?fields=` and `?expand=`; with neither, the full RideSerializer shape.
+
+        `fields` limits the ride to the listed fields (`id_ride` is always included). Once either is
+        given, `id_rider`/`id_driver` render as ids unless expanded and `todays_ride_events` is only
+        included when listed in `fields` or `expand`. Raises InvalidFieldset for unknown names.
+        """
+        if cls._ride_plan is None:
+            cls._compile()
+        key = (
+            frozenset(fields) if fields is not None else None,
+            frozenset(expand) if expand is not None else None,
+        )
+        shape = cls._shapes.get(key)
+        if shape is not None:
+            return shape
+
+        names = [name for name, _, _ in cls._ride_plan]
+        expandable = [*cls._relations, cls.EVENTS_FIELD]
+        unknown = sorted((key[0] or set()) - set(names))
+        if unknown:
+            raise InvalidFieldset(f"Unknown field(s) {', '.join(unknown)}. Use any of: {', '.join(names)}.")
+        unknown = sorted((key[1] or set()) - set(expandable))
+        if unknown:
+            raise InvalidFieldset(f"Cannot expand {', '.join(unknown)}. Use any of: {', '.join(expandable)}.")
+
+        expanded = set(key[1] or ())
+        if key[0] is None:
+            selected = set(names) - {cls.EVENTS_FIELD} | expanded
+        else:
+            selected = key[0] | expanded | {'id_ride'}
+            if cls.EVENTS_FIELD in selected:
+                expanded.add(cls.EVENTS_FIELD)
+
+        plan = []
+        values_fields = list(cls.KEY_FIELDS)
+        for name, source, converter in cls._ride_plan:
+            if name not in selected:
+                continue
+            if isinstance(source, tuple) and name not in expanded:
+                # Collapsed relation: the foreign key column, no join.
+                source, converter = cls._relations[name], None
+            plan.append((name, source, converter))
+            if isinstance(source, tuple):
+                values_fields.extend(nested_source for _, nested_source, _ in source)
+            elif source is not None and source not in values_fields:
+                values_fields.append(source)
+
+        shape_key = hashlib.sha1(','.join(
+            f'{name}+' if name in expanded else name for name, _, _ in plan
+        ).encode('utf-8')).hexdigest()[:16]
+        shape = RideShape(shape_key, tuple(plan), tuple(values_fields), cls.EVENTS_FIELD in selected)
+        cls._shapes[key] = shape
+        return shape
+
+    @staticmethod
+    def _render(row, source, converter):
+        value = row[source]
+        if value is None or converter is None:
+            return value
+        return converter(value)
+
+    @classmethod
+    def events(cls, ride_ids: Iterable[int], since: datetime = None,
+               include_archive: bool = False) -> Dict[int, List[dict]]:
+        """
+        Serialized events grouped by ride, oldest first; `ride_ids` may be a subquery.
+
+        With `include_archive=True` events moved to `ride_event_archive` are included too.
+        """
+        if cls._ride_plan is None:
+            cls._compile()
+        event_plan = cls._event_plan
+        sources = [source for _, source, _ in event_plan]
+        querysets = [RideEvent.objects.filter(id_ride__in=ride_ids)]
+        if include_archive:
+            querysets.append(RideEventArchive.objects.filter(id_ride__in=ride_ids))
+        if since is not None:
+            querysets = [queryset.filter(created_at__gte=since) for queryset in querysets]
+        rows = querysets[0].values(*sources)
+        if include_archive:
+            rows = rows.union(querysets[1].values(*sources), all=True)
+        rows = rows.order_by('created_at')
+
+        events_by_ride = {}
+        render = cls._render
+        for row in rows:
+            events_by_ride.setdefault(row['id_ride'], []).append(
+                {name: render(row, source, converter) for name, source, converter in event_plan}
+            )
+        return events_by_ride
+
+    @classmethod
+    def todays_events(cls, ride_ids: Iterable[int]) -> Dict[int, List[dict]]:
+        """Serialized events of the last 24 hours grouped by ride; `ride_ids` may be a subquery."""
+        return cls.events(ride_ids, since=timezone.now() - timedelta(hours=24))
+
+    @classmethod
+    def serialize_rows(cls, rows: List[dict], events_by_ride: Dict[int, List[dict]] = None,
+                       shape: RideShape = None) -> List[dict]:
+        """
+        Serialize rows fetched with `.values(*RideFastSerializer.values_fields(shape))`.
+
+        `events_by_ride` can be passed when the events were already fetched with `todays_events`.
+        """
+        if cls._ride_plan is None:
+            cls._compile()
+        if not rows:
+            return []
+
+        shape = shape or cls._shapes[(None, None)]
+        if events_by_ride is None and shape.events:
+            events_by_ride = cls.todays_events([row['id_ride'] for row in rows])
+        render = cls._render
+        results = []
+        for row in rows:
+            data = {}
+            for name, source, converter in shape.plan:
+                if source is None:
+                    data[name] = events_by_ride.get(row['id_ride'], [])
+                elif isinstance(source, tuple):
+                    data[name] = {
+                        nested_name: render(row, nested_source, nested_converter)
+                        for nested_name, nested_source, nested_converter in source
+                    }
+                else:
+                    data[name] = render(row, source, converter)
+            results.append(data)
+        return results
+
+    @classmethod
+    def serialize_queryset(cls, queryset: QuerySet, shape: RideShape = None) -> List[dict]:
+        return cls.serialize_rows(list(queryset.values(*cls.values_fields(shape))), shape=shape)
@@ -0,0 +1,128 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, List
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from ride.fast_serializer import RideFastSerializer, RideShape
+from ride.models import Ride
+from todo_project.database import read_primary
+from todo_project.sql_instrumentation import record_serialize
+
+
+class RideFragmentCache:
+    """
+    Cache of each ride's rendered JSON, so list pages are stitched together from the rides that did
+    not change instead of serializing and rendering every ride again.
+
+    A fragment's key holds the ride id, the response shape and the version tokens of the ride and of
+    its rider and driver. Saving or deleting a Ride, RideEvent or User (and the bulk paths that skip
+    signals) drops the affected tokens; the next read mints new random ones, so old fragments are
+    never read again and age out. A token lost to eviction is replaced the same way, which costs a
+    re-render but never serves a stale fragment. Fragments holding events of the last 24 hours expire
+    when their oldest such event leaves that window.
+    """
+
+    CACHE_ALIAS = 'ride_fragments'
+    VERSION_KEY = 'ride_fragment:version:{}:{}'
+    # Columns a page query needs to look fragments up (and to build pickup_time cursors).
+    ROW_FIELDS = ('id_ride', 'pickup_time', 'id_rider', 'id_driver')
+
+    @classmethod
+    def invalidate(cls, kind: str, ids: Iterable[int]):
+        """Drop the version tokens of the given rides (`kind='ride'`) or users (`kind='user'`)."""
+        keys = [cls.VERSION_KEY.format(kind, pk) for pk in set(ids)]
+        if not keys:
+            return
+        cache = caches[cls.CACHE_ALIAS]
+        cache.delete_many(keys)
+        # Again once the write is visible: a reader that minted a token in between may have
+        # rendered the rows as they were before the transaction.
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @classmethod
+    def _versions(cls, keys: List[str]) -> dict:
+        cache = caches[cls.CACHE_ALIAS]
+        versions = cache.get_many(keys)
+        missing = [key for key in keys if key not in versions]
+        if missing:
+            for key in missing:
+                # add(): concurrent readers minting a token for the same key settle on the first one.
+                cache.add(key, uuid.uuid4().hex, None)
+            versions.update(cache.get_many(missing))
+        return versions
+
+    @staticmethod
+    def _timeout(ride: dict, now: datetime) -> int:
+        timeout = caches[RideFragmentCache.CACHE_ALIAS].default_timeout
+        events = ride.get(RideFastSerializer.EVENTS_FIELD)
+        if events:
+            oldest = datetime.fromisoformat(events[0]['created_at'])
+            leaves_window = (oldest + timedelta(hours=24) - now).total_seconds()
+            timeout = max(1, min(timeout, int(leaves_window)))
+        return timeout
+
+    @classmethod
+    def fragments(cls, rows: List[dict], shape: RideShape = None) -> List[bytes]:
+        """
+        Rendered JSON of each ride in `rows` (dicts holding ROW_FIELDS), in order.
+
+        Only rides without a current fragment are read, serialized and rendered. They are read after
+        their versions, so a concurrent write cannot leave an old rendering under a new version.
+        Rides deleted since `rows` was read are left out.
+        """
+        if not rows:
+            return []
+        shape = shape or RideFastSerializer.shape()
+
+        version_keys = set()
+        for row in rows:
+            version_keys.add(cls.VERSION_KEY.format('ride', row['id_ride']))
+            version_keys.add(cls.VERSION_KEY.format('user', row['id_rider']))
+            version_keys.add(cls.VERSION_KEY.format('user', row['id_driver']))
+        versions = cls._versions(list(version_keys))
+
+        keys = {}
+        for row in rows:
+            keys[row['id_ride']] = 'ride_fragment:{}:{}:{}:{}:{}'.format(
+                shape.key, row['id_ride'],
+                versions[cls.VERSION_KEY.format('ride', row['id_ride'])],
+                versions[cls.VERSION_KEY.format('user', row['id_rider'])],
+                versions[cls.VERSION_KEY.format('user', row['id_driver'])],
+            )
+
+        cache = caches[cls.CACHE_ALIAS]
+        found = cache.get_many(list(keys.values()))
+        missing = [id_ride for id_ride, key in keys.items() if key not in found]
+        if missing:
+            # Read misses from the primary: a lagging replica's rows would stay cached under the
+            # new version until the ride changes again.
+            with read_primary():
+                rides = RideFastSerializer.serialize_queryset(Ride.objects.filter(id_ride__in=missing), shape=shape)
+            renderer = JSONRenderer()
+            with record_serialize():
+                rendered = [(ride, renderer.render(ride)) for ride in rides]
+            now = timezone.now()
+            for ride, content in rendered:
+                key = keys[ride['id_ride']]
+                found[key] = content
+                cache.set(key, content, cls._timeout(ride, now))
+
+        return [found[keys[row['id_ride']]] for row in rows if keys[row['id_ride']] in found]
+
+    @staticmethod
+    def response(body: dict) -> HttpResponse:
+        """JSON response for `body`, whose `results` (its last key) is a list of rendered fragments."""
+        body = dict(body)
+        results = body.pop('results')
+        with record_serialize():
+            head = JSONRenderer().render(body)[:-1]
+            content = b''.join([head, b',' if body else b'', b'"results":[', b','.join(results), b']}'])
+        return HttpResponse(content, content_type='application/json')
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, 'RIDE_FRAGMENT_CACHE', True)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ride.models import Ride
+from ride.services import RideService
+from todo_project.count_cache import CountCache
+
+
+class Command(BaseCommand):
+    help = 'Recompute pickup_event_at, dropoff_event_at and trip_duration_seconds on every Ride from its RideEvents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rides recomputed per transaction (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+
+        self.stdout.write(self.style.SUCCESS('Backfilling ride trip times...'))
+
+        while True:
+            ride_ids = list(
+                Ride.objects.filter(id_ride__gt=last_id).order_by('id_ride').values_list('id_ride', flat=True)[:batch_size]
+            )
+            if not ride_ids:
+                break
+
+            with transaction.atomic():
+                updated += RideService.refresh_trip_times(ride_ids)
+
+            last_id = ride_ids[-1]
+            self.stdout.write(f'Processed rides up to #{last_id}')
+
+        CountCache.bump('ride')
+        self.stdout.write(self.style.SUCCESS(f'Backfill completed: {updated} rides updated.'))
@@ -0,0 +1,206 @@
+import json
+import math
+from io import StringIO
+import random
+import time
+import tracemalloc
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ride.models import Ride
+from user.models import User
+from user.token_utils import TokenUtils
+
+
+BENCHMARK_EMAIL = 'benchmark.admin@example.com'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    # Rounded first so float error (0.07 * 100 == 7.000000000000001) does not push it up a rank.
+    index = max(0, min(len(sorted_values) - 1, math.ceil(round(fraction * len(sorted_values), 9)) - 1))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the ride, user and event API paths on datasets of several sizes and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,100000,1000000',
+            help='Comma-separated ride counts to benchmark, smallest first (default: 1000,100000,1000000)',
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per scenario (default: 20)')
+        parser.add_argument('--output', default='benchmark.json', help='File the JSON results are written to')
+        parser.add_argument('--compare', default=None, help='Previous results file to print p50/p95 changes against')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the datasets (default: 42)')
+        parser.add_argument('--workers', type=int, default=1, help='Processes used by seed_data (default: 1)')
+        parser.add_argument('--only', default=None, help='Only run scenarios whose name contains this text')
+
+    def scenarios(self, rng, ride_ids):
+        rides = '/api/rides/'
+        return [
+            ('rides: default', lambda: ('get', rides, {})),
+            ('rides: status', lambda: ('get', rides, {'status': 'completed'})),
+            ('rides: email', lambda: ('get', rides, {'email': 'example.com'})),
+            ('rides: sort=pickup_time asc', lambda: ('get', rides, {'sort': 'pickup_time', 'order': 'asc'})),
+            ('rides: sort=pickup_time desc', lambda: ('get', rides, {'sort': 'pickup_time', 'order': 'desc'})),
+            ('rides: status + sort=pickup_time', lambda: ('get', rides, {'status': 'pickup', 'sort': 'pickup_time'})),
+            ('rides: sort=distance', lambda: ('get', rides, {'sort': 'distance', 'lat': 40.7128, 'lon': -74.0060})),
+            ('rides: sort=distance + status', lambda: ('get', rides, {
+                'sort': 'distance', 'lat': 40.7128, 'lon': -74.0060, 'status': 'en-route'})),
+            ('rides: within_km', lambda: ('get', rides, {'lat': 40.7128, 'lon': -74.0060, 'within_km': 2})),
+            ('rides: bbox', lambda: ('get', rides, {'bbox': '40.70,-74.02,40.76,-73.97'})),
+            ('rides: deep page', lambda: ('get', rides, {'page': 50})),
+            ('rides: cursor', lambda: ('get', rides, {'cursor': ''})),
+            ('rides: count=estimated', lambda: ('get', rides, {'count': 'estimated'})),
+            ('rides: retrieve', lambda: ('get', f'{rides}{rng.choice(ride_ids)}/', {})),
+            ('with_duration: default', lambda: ('get', f'{rides}with_duration/', {})),
+            ('with_duration: sort=duration', lambda: ('get', f'{rides}with_duration/', {'sort': 'duration'})),
+            ('users: list', lambda: ('get', '/api/users/', {})),
+            ('users: signin', lambda: ('post', '/api/users/signin/', {
+                'email': BENCHMARK_EMAIL, 'password': BENCHMARK_PASSWORD})),
+        ]
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers.')
+        if options['iterations'] <= 0:
+            raise CommandError('--iterations must be positive.')
+
+        # Everything runs against a throwaway test database, never the configured one.
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = self.run_sizes(sizes, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def run_sizes(self, sizes, options):
+        admin = User.objects.create(
+            email=BENCHMARK_EMAIL, first_name='Benchmark', last_name='Admin', phone_number='0000000000',
+            password=make_password(BENCHMARK_PASSWORD), role='admin'
+        )
+        client = APIClient()
+        token = TokenUtils.generate_token(admin)
+        client.credentials(HTTP_COOKIE=token, HTTP_AUTHORIZATION=f'Token {token}')
+
+        results = {}
+        for size in sizes:
+            # Datasets grow incrementally: each size only seeds the rides it is missing.
+            missing = size - Ride.objects.count()
+            if missing > 0:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'Seeding {missing} rides...'))
+                call_command(
+                    'seed_data', rides=missing, users=max(0, size // 100 - User.objects.count()),
+                    seed=options['seed'] + size, workers=options['workers'], stdout=StringIO()
+                )
+            cache.clear()
+
+            rng = random.Random(options['seed'])
+            ride_ids = list(Ride.objects.order_by('?').values_list('id_ride', flat=True)[:1000])
+            results[str(size)] = {}
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {size} rides'))
+            for name, build in self.scenarios(rng, ride_ids):
+                if options['only'] and options['only'] not in name:
+                    continue
+                stats = self.measure(client, build, options['iterations'])
+                results[str(size)][name] = stats
+                self.stdout.write(
+                    f'  {name:<36} p50 {stats["p50_ms"]:8.2f} ms  p95 {stats["p95_ms"]:8.2f} ms  '
+                    f'queries {stats["queries"]:3d}  peak {stats["peak_memory_kb"]:9.1f} KiB'
+                )
+        return results
+
+    def request(self, client, build):
+        method, path, params = build()
+        if method == 'post':
+            response = client.post(path, params, format='json')
+        else:
+            response = client.get(path, params)
+        if response.status_code != 200:
+            raise CommandError(f'{method.upper()} {path} {params} returned {response.status_code}: {response.content[:200]!r}')
+        return response
+
+    def measure(self, client, build, iterations):
+        # The first request warms lazily built state (distance index, compiled plans, count cache).
+        self.request(client, build)
+
+        timings = []
+        query_counts = []
+        for _ in range(iterations):
+            # Measure the query path, not ResponseCache hits.
+            caches['responses'].clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                self.request(client, build)
+                timings.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(queries))
+
+        # Memory is measured on a separate request: tracemalloc slows allocation down.
+        caches['responses'].clear()
+        tracemalloc.start()
+        try:
+            self.request(client, build)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': max(query_counts),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def compare(self, path, results):
+        try:
+            with open(path) as f:
+                previous = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Cannot read previous results from {path}: {e}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Compared with {path}'))
+        for size, scenarios in results.items():
+            for name, stats in scenarios.items():
+                before = previous.get(size, {}).get(name)
+                if not before:
+                    continue
+                changes = []
+                for key in ('p50_ms', 'p95_ms'):
+                    if before[key]:
+                        changes.append(f'{key[:3]} {(stats[key] - before[key]) / before[key] * 100:+6.1f}%')
+                line = f'  {size:>8} {name:<36} ' + '  '.join(changes) + f'  queries {before["queries"]} -> {stats["queries"]}'
+                slower = stats['p95_ms'] > before['p95_ms'] * 1.1 or stats['queries'] > before['queries']
+                self.stdout.write(self.style.WARNING(line) if slower else line)
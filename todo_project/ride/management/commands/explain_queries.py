@@ -0,0 +1,100 @@
+import re
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from ride.rollups import RideStatusRollups
+from ride.services import RideService
+from user.services import UserService
+
+
+# A plan line like "SCAN ride" (no index, no virtual table) means the table is walked row by row.
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+
+class Command(BaseCommand):
+    help = 'Print the query plan of every query issued by the RideService/UserService list and lookup paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Exit with an error if any query falls back to a full table scan',
+        )
+
+    def scenarios(self):
+        return [
+            ('rides: default', lambda: RideService.get_filtered_and_sorted_rides()),
+            ('rides: status', lambda: RideService.get_filtered_and_sorted_rides(status='completed')),
+            ('rides: email', lambda: RideService.get_filtered_and_sorted_rides(email='example.com')),
+            ('rides: pickup_time asc', lambda: RideService.get_filtered_and_sorted_rides(sort_by='pickup_time', order='asc')),
+            ('rides: status + pickup_time asc', lambda: RideService.get_filtered_and_sorted_rides(
+                status='completed', sort_by='pickup_time', order='asc')),
+            ('rides: cursor', lambda: RideService.get_filtered_and_sorted_rides(cursor='')),
+            ('rides: seek to sort datetime', lambda: RideService.get_filtered_and_sorted_rides(
+                sort_by=(timezone.now() - timedelta(days=1)).isoformat())),
+            ('rides: status + from/to', lambda: RideService.get_filtered_and_sorted_rides(
+                status='completed', pickup_from=timezone.now() - timedelta(days=7), pickup_to=timezone.now())),
+            ('rides: bbox', lambda: RideService.get_filtered_and_sorted_rides(bbox=(40.70, -74.02, 40.76, -73.97))),
+            ('rides: within_km', lambda: RideService.get_filtered_and_sorted_rides(lat=40.7128, lon=-74.0060, within_km=5)),
+            ('with_duration: default', lambda: RideService.get_rides_with_duration()),
+            ('with_duration: sort=duration', lambda: RideService.get_rides_with_duration(sort_by='duration')),
+            ('with_duration: cursor', lambda: RideService.get_rides_with_duration(cursor='')),
+            ('rides: stats', lambda: RideStatusRollups.stats(timezone.now() - timedelta(hours=24), timezone.now())),
+            ('users: list', lambda: UserService.get_all_users()),
+            ('users: cursor', lambda: UserService.get_all_users(cursor='')),
+            ('users: by email', lambda: UserService.get_user_by_email('admin@example.com')),
+            ('users: email exists', lambda: UserService.check_email_exists('admin@example.com')),
+            ('users: by role', lambda: UserService.get_users_by_role('driver')),
+        ]
+
+    def capture(self, func):
+        captured = []
+
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                captured.append((sql, params))
+            return execute(sql, params, many, context)
+
+        # COUNT_CACHE_TIMEOUT=0 makes every count hit the database so it shows up here.
+        with override_settings(COUNT_CACHE_TIMEOUT=0), connection.execute_wrapper(wrapper):
+            func()
+        return captured
+
+    def explain(self, sql, params):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        if connection.vendor == 'sqlite':
+            return [row[-1] for row in rows]
+        return [' '.join(str(col) for col in row) for row in rows]
+
+    def handle(self, *args, **options):
+        full_scans = []
+
+        for name, func in self.scenarios():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name}'))
+            for sql, params in self.capture(func):
+                self.stdout.write(sql)
+                plan = self.explain(sql, params)
+                # Walking the table in rowid order under a LIMIT without a sort step stops after one page.
+                early_exit = LIMIT.search(sql) and not any('TEMP B-TREE' in line for line in plan)
+                for line in plan:
+                    match = FULL_SCAN.match(line.strip())
+                    if match and not early_exit:
+                        full_scans.append((name, match.group(1)))
+                        self.stdout.write(self.style.WARNING(f'    {line}  <-- full table scan'))
+                    else:
+                        self.stdout.write(f'    {line}')
+                self.stdout.write('')
+
+        if full_scans:
+            summary = ', '.join(f'{name} ({table})' for name, table in full_scans)
+            if options['strict']:
+                raise CommandError(f'Full table scans found: {summary}')
+            self.stdout.write(self.style.WARNING(f'Full table scans found: {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No full table scans found.'))
@@ -0,0 +1,270 @@
+import http.client
+import json
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from ride.management.commands.benchmark import percentile
+
+
+DEFAULT_MIX = 'rides=35,rides_filtered=15,rides_distance=15,with_duration=15,retrieve=10,event=10'
+
+LOCATIONS = [(40.7128, -74.0060), (40.7580, -73.9855), (40.7306, -73.9352), (40.6782, -73.9442)]
+STATUSES = ['en-route', 'pickup', 'dropoff', 'completed', 'cancelled']
+
+
+def build_request(scenario, rng, ride_ids):
+    """(method, path, body) of one request of the given scenario."""
+    rides = '/api/rides/'
+    if scenario == 'rides':
+        return 'GET', f'{rides}?{urlencode({"page": rng.randint(1, 5)})}', None
+    if scenario == 'rides_filtered':
+        params = rng.choice([
+            {'status': rng.choice(STATUSES)},
+            {'email': 'example.com'},
+            {'status': rng.choice(STATUSES), 'sort': 'pickup_time', 'order': rng.choice(['asc', 'desc'])},
+        ])
+        return 'GET', f'{rides}?{urlencode(params)}', None
+    if scenario == 'rides_distance':
+        lat, lon = rng.choice(LOCATIONS)
+        return 'GET', f'{rides}?{urlencode({"sort": "distance", "lat": lat, "lon": lon})}', None
+    if scenario == 'with_duration':
+        params = rng.choice([{}, {'sort': 'duration'}, {'min_duration': 10}])
+        return 'GET', f'{rides}with_duration/?{urlencode(params)}', None
+    if scenario == 'retrieve':
+        return 'GET', f'{rides}{rng.choice(ride_ids)}/', None
+    if scenario == 'event':
+        return 'POST', '/api/ride-events/', {'id_ride': rng.choice(ride_ids), 'description': 'Load test event'}
+    raise ValueError(scenario)
+
+
+class Client:
+    """One keep-alive HTTP connection, reopened after connection errors."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.timeout = timeout
+        self.token = None
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """Returns (status, parsed JSON body or None)."""
+        headers = {'Accept': 'application/json'}
+        if self.token:
+            # The rides API reads the bare token from the Cookie header, the others accept either.
+            headers['Cookie'] = self.token
+            headers['Authorization'] = f'Token {self.token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if self.connection is None:
+            self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        try:
+            return response.status, json.loads(content) if content else None
+        except ValueError:
+            return response.status, None
+
+    def signin(self, email, password):
+        status, body = self.request('POST', '/api/users/signin/', {'email': email, 'password': password})
+        if status != 200:
+            message = body.get('message') if isinstance(body, dict) else None
+            raise RuntimeError(f'Signin as {email} failed with {status}: {message}')
+        self.token = body['data']['token']
+
+
+def run_worker(task):
+    """
+    Sign in, then send requests of the weighted scenario mix until the deadline.
+
+    Module level so it can run in a worker process. Returns one (seconds since start, scenario,
+    latency ms, status or None, error or None) tuple per request.
+    """
+    rng = random.Random(f'{task["seed"]}:{task["worker"]}')
+    client = Client(task['base_url'], task['timeout'])
+    client.signin(task['email'], task['password'])
+
+    scenarios, weights = zip(*task['mix'])
+    records = []
+    # Workers start together, so the first seconds show the real concurrency.
+    time.sleep(max(0.0, task['start_at'] - time.time()))
+    started = task['start_at']
+    while time.time() < task['end_at']:
+        scenario = rng.choices(scenarios, weights)[0]
+        method, path, body = build_request(scenario, rng, task['ride_ids'])
+        begin = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, body)
+            error = None
+        except (OSError, http.client.HTTPException) as e:
+            status, error = None, type(e).__name__
+        records.append((time.time() - started, scenario, (time.perf_counter() - begin) * 1000, status, error))
+    return records
+
+
+class Command(BaseCommand):
+    help = 'Put concurrent load on a running server with a weighted mix of ride and ride-event requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to load (default: http://127.0.0.1:8000)')
+        parser.add_argument('--email', required=True, help='Admin account the workers sign in as')
+        parser.add_argument('--password', required=True, help='Password of that account')
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent clients (default: 8)')
+        parser.add_argument(
+            '--mode',
+            choices=['threads', 'processes'],
+            default='threads',
+            help='Run clients as threads of this process or as separate processes (default: threads)',
+        )
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run (default: 30)')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds per row of the over-time report (default: 5)')
+        parser.add_argument(
+            '--mix',
+            default=DEFAULT_MIX,
+            help=f'Scenario weights, name=weight comma-separated (default: {DEFAULT_MIX})',
+        )
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds (default: 30)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the request mix (default: 42)')
+        parser.add_argument('--output', default=None, help='Also write the results as JSON to this file')
+
+    def parse_mix(self, value):
+        mix = []
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            try:
+                build_request(name, random.Random(), [1])
+                weight = float(weight)
+            except ValueError:
+                raise CommandError(f'Invalid --mix entry "{part}"; scenarios are {DEFAULT_MIX}.')
+            if weight > 0:
+                mix.append((name, weight))
+        if not mix:
+            raise CommandError('--mix needs at least one scenario with a positive weight.')
+        return mix
+
+    def handle(self, *args, **options):
+        if options['concurrency'] <= 0 or options['duration'] <= 0 or options['interval'] <= 0:
+            raise CommandError('--concurrency, --duration and --interval must be positive.')
+        mix = self.parse_mix(options['mix'])
+
+        # Sign in once up front: fails fast on bad credentials and fetches ride ids to retrieve and post to.
+        client = Client(options['base_url'], options['timeout'])
+        try:
+            client.signin(options['email'], options['password'])
+            status, body = client.request('GET', '/api/rides/?page_size=100')
+        except (OSError, http.client.HTTPException, RuntimeError) as e:
+            raise CommandError(f'Cannot reach {options["base_url"]}: {e}')
+        ride_ids = [ride['id_ride'] for ride in (body or {}).get('results', [])] if status == 200 else []
+        if not ride_ids and any(name in ('retrieve', 'event') for name, _ in mix):
+            raise CommandError('The server has no rides to retrieve or post events to; run seed_data first.')
+
+        start_at = time.time() + 1 + options['concurrency'] * 0.1
+        tasks = [{
+            'worker': worker,
+            'base_url': options['base_url'],
+            'email': options['email'],
+            'password': options['password'],
+            'timeout': options['timeout'],
+            'seed': options['seed'],
+            'mix': mix,
+            'ride_ids': ride_ids,
+            'start_at': start_at,
+            'end_at': start_at + options['duration'],
+        } for worker in range(options['concurrency'])]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Running {options["concurrency"]} {options["mode"]} against {options["base_url"]} for {options["duration"]:g}s...'
+        ))
+        executor_class = ProcessPoolExecutor if options['mode'] == 'processes' else ThreadPoolExecutor
+        try:
+            with executor_class(max_workers=options['concurrency']) as executor:
+                records = [record for worker_records in executor.map(run_worker, tasks) for record in worker_records]
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        report = self.report(records, mix, options)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    @staticmethod
+    def summarize(records, seconds):
+        latencies = sorted(record[2] for record in records)
+        errors = sum(1 for record in records if record[3] is None or record[3] >= 400)
+        return {
+            'requests': len(records),
+            'throughput_rps': round(len(records) / seconds, 1) if seconds else None,
+            'error_rate': round(errors / len(records), 4) if records else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else None,
+        }
+
+    def write_row(self, label, stats):
+        line = (
+            f'  {label:<16} {stats["requests"]:7d} req  {stats["throughput_rps"] or 0:8.1f} req/s  '
+            f'p50 {stats["p50_ms"] or 0:8.1f}  p95 {stats["p95_ms"] or 0:8.1f}  p99 {stats["p99_ms"] or 0:8.1f} ms  '
+            f'errors {stats["error_rate"] * 100:5.1f}%'
+        )
+        self.stdout.write(self.style.WARNING(line) if stats['error_rate'] else line)
+
+    def report(self, records, mix, options):
+        interval = options['interval']
+        duration = options['duration']
+
+        timeline = defaultdict(list)
+        by_scenario = defaultdict(list)
+        status_counts = defaultdict(int)
+        for record in records:
+            timeline[min(int(record[0] // interval), int((duration - 1e-9) // interval))].append(record)
+            by_scenario[record[1]].append(record)
+            status_counts[str(record[3]) if record[3] is not None else record[4]] += 1
+
+        # Over time: throughput or latency changing while concurrency stays fixed points at saturation
+        # or lock contention setting in.
+        self.stdout.write(self.style.MIGRATE_HEADING('Over time'))
+        over_time = []
+        for bucket in range(int((duration - 1e-9) // interval) + 1):
+            seconds = min(interval, duration - bucket * interval)
+            stats = {'from_s': round(bucket * interval, 2), **self.summarize(timeline.get(bucket, []), seconds)}
+            over_time.append(stats)
+            self.write_row(f'{bucket * interval:6.1f}s', stats)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('By scenario'))
+        scenarios = {}
+        for name, _ in mix:
+            scenarios[name] = self.summarize(by_scenario.get(name, []), duration)
+            self.write_row(name, scenarios[name])
+
+        total = self.summarize(records, duration)
+        self.stdout.write(self.style.MIGRATE_HEADING('Total'))
+        self.write_row('all', total)
+        self.stdout.write(f'  responses: {", ".join(f"{key}={count}" for key, count in sorted(status_counts.items()))}')
+
+        return {
+            'generated_at': timezone.now().isoformat(),
+            'base_url': options['base_url'],
+            'mode': options['mode'],
+            'concurrency': options['concurrency'],
+            'duration_s': duration,
+            'mix': dict(mix),
+            'total': total,
+            'status_counts': dict(status_counts),
+            'scenarios': scenarios,
+            'over_time': over_time,
+        }
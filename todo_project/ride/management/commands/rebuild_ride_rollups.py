@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from ride.rollups import RideStatusRollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the ride_status_rollup table (ride counts per status and pickup hour) from the ride table'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Rebuilding ride status rollups...'))
+        buckets = RideStatusRollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuild completed: {buckets} (status, hour) buckets.'))
@@ -1,10 +1,125 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
 from django.utils import timezone
 from datetime import timedelta
+from multiprocessing import Pool
 import random
+import django
 from user.models import User
 from ride.models import Ride
-from ride_event.models import RideEvent
+from ride.distance_index import ride_distance_index
+from ride.fragment_cache import RideFragmentCache
+from ride.rollups import RideStatusRollups
+from ride_event.models import RideEvent, RideEventArchive
+from todo_project.count_cache import CountCache
+
+
+STATUSES = ['en-route', 'pickup', 'dropoff', 'completed', 'cancelled']
+
+SAMPLE_LOCATIONS = [
+    {'pickup': (40.7128, -74.0060), 'dropoff': (40.7589, -73.9851)},
+    {'pickup': (40.7505, -73.9934), 'dropoff': (40.7282, -73.7949)},
+    {'pickup': (40.7614, -73.9776), 'dropoff': (40.6782, -73.9442)},
+    {'pickup': (40.7489, -73.9680), 'dropoff': (40.6892, -74.0445)},
+    {'pickup': (40.7282, -73.7949), 'dropoff': (40.7128, -74.0060)},
+]
+
+EVENT_DESCRIPTIONS = [
+    'Ride requested',
+    'Driver assigned',
+    'Driver on the way',
+    'Driver arrived at pickup location',
+    'Passenger picked up',
+    'Ride in progress',
+    'Arrived at destination',
+    'Ride completed',
+    'Payment processed',
+    'Ride cancelled by passenger',
+    'Ride cancelled by driver',
+]
+
+SAMPLE_USERS = [
+    {'first_name': 'John', 'last_name': 'Doe', 'email': 'john.doe@example.com', 'phone_number': '1234567890', 'role': 'user'},
+    {'first_name': 'Jane', 'last_name': 'Smith', 'email': 'jane.smith@example.com', 'phone_number': '1234567891', 'role': 'user'},
+    {'first_name': 'Mike', 'last_name': 'Johnson', 'email': 'mike.johnson@example.com', 'phone_number': '1234567892', 'role': 'driver'},
+    {'first_name': 'Sarah', 'last_name': 'Williams', 'email': 'sarah.williams@example.com', 'phone_number': '1234567893', 'role': 'driver'},
+    {'first_name': 'David', 'last_name': 'Brown', 'email': 'david.brown@example.com', 'phone_number': '1234567894', 'role': 'driver'},
+]
+
+SAMPLE_PASSWORD = 'password123'
+
+
+def generate_chunk(task):
+    """
+    Build the rows of one chunk of rides and their events as plain tuples.
+
+    Runs in worker processes, so it touches neither the ORM nor the database. The chunk's
+    random generator is seeded from (seed, chunk index), which keeps the output identical
+    whatever the number of workers.
+    """
+    seed, chunk_index, first_id, count, rider_ids, driver_ids, events_per_ride, now = task
+    rng = random.Random(f'{seed}:{chunk_index}')
+    rides = []
+    events = []
+
+    for id_ride in range(first_id, first_id + count):
+        rider = rng.choice(rider_ids)
+        driver = rng.choice(driver_ids)
+        if rider == driver and len(driver_ids) > 1:
+            driver = driver_ids[(driver_ids.index(driver) + 1) % len(driver_ids)]
+
+        location = rng.choice(SAMPLE_LOCATIONS)
+        status = rng.choice(STATUSES)
+        pickup_time = now - timedelta(
+            days=rng.randint(0, 30),
+            hours=rng.randint(0, 23),
+            minutes=rng.randint(0, 59)
+        )
+
+        descriptions = []
+        num_events = events_per_ride if events_per_ride is not None else rng.randint(2, 5)
+        for _ in range(num_events):
+            descriptions.append(rng.choice(EVENT_DESCRIPTIONS))
+
+        # Rides that got past pickup/dropoff carry the status events with_duration relies on.
+        pickup_event_at = None
+        dropoff_event_at = None
+        ride_events = []
+        event_time = pickup_time
+        for description in descriptions:
+            event_time = event_time + timedelta(minutes=rng.randint(5, 30))
+            ride_events.append((description, event_time))
+        if status in ('pickup', 'dropoff', 'completed'):
+            pickup_event_at = pickup_time + timedelta(minutes=rng.randint(1, 10))
+            ride_events.append((RideEvent.PICKUP_DESCRIPTION, pickup_event_at))
+        if status in ('dropoff', 'completed'):
+            dropoff_event_at = pickup_event_at + timedelta(minutes=rng.randint(5, 90))
+            ride_events.append((RideEvent.DROPOFF_DESCRIPTION, dropoff_event_at))
+
+        # Shift the whole timeline back when its last event would land in the future.
+        latest = max(created_at for _, created_at in ride_events) if ride_events else pickup_time
+        if latest > now:
+            shift = latest - now + timedelta(minutes=rng.randint(1, 60))
+            pickup_time -= shift
+            pickup_event_at = pickup_event_at - shift if pickup_event_at else None
+            dropoff_event_at = dropoff_event_at - shift if dropoff_event_at else None
+            ride_events = [(description, created_at - shift) for description, created_at in ride_events]
+
+        for description, created_at in ride_events:
+            events.append((id_ride, description, created_at))
+        duration = int((dropoff_event_at - pickup_event_at).total_seconds()) if dropoff_event_at else None
+
+        rides.append((
+            id_ride, status, rider, driver,
+            location['pickup'][0] + rng.gauss(0, 0.01), location['pickup'][1] + rng.gauss(0, 0.01),
+            location['dropoff'][0] + rng.gauss(0, 0.01), location['dropoff'][1] + rng.gauss(0, 0.01),
+            pickup_time, pickup_event_at, dropoff_event_at, duration,
+        ))
+
+    return rides, events
 
 
 class Command(BaseCommand):
@@ -16,140 +131,174 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data before seeding',
         )
+        parser.add_argument('--rides', type=int, default=10, help='Number of rides to create (default: 10)')
+        parser.add_argument(
+            '--events-per-ride',
+            type=int,
+            default=None,
+            help='Random events per ride, besides pickup/dropoff status events (default: 2 to 5)',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=0,
+            help='Extra generated users (about 1 in 5 a driver), all with the sample password',
+        )
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rides written per transaction (default: 5000)')
+        parser.add_argument('--workers', type=int, default=1, help='Processes used to generate rows (default: 1)')
 
     def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive.')
+
         if options['clear']:
             self.stdout.write(self.style.WARNING('Clearing existing data...'))
-            RideEvent.objects.all().delete()
-            Ride.objects.all().delete()
+            self.clear()
             self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
 
         self.stdout.write(self.style.SUCCESS('Starting to seed data...'))
 
-        users = User.objects.all()
-        if users.count() < 5:
-            self.stdout.write(self.style.WARNING('Creating sample users...'))
-            sample_users = [
-                {'first_name': 'John', 'last_name': 'Doe', 'email': 'john.doe@example.com', 'phone_number': '1234567890', 'role': 'user'},
-                {'first_name': 'Jane', 'last_name': 'Smith', 'email': 'jane.smith@example.com', 'phone_number': '1234567891', 'role': 'user'},
-                {'first_name': 'Mike', 'last_name': 'Johnson', 'email': 'mike.johnson@example.com', 'phone_number': '1234567892', 'role': 'driver'},
-                {'first_name': 'Sarah', 'last_name': 'Williams', 'email': 'sarah.williams@example.com', 'phone_number': '1234567893', 'role': 'driver'},
-                {'first_name': 'David', 'last_name': 'Brown', 'email': 'david.brown@example.com', 'phone_number': '1234567894', 'role': 'driver'},
-            ]
-            
-            for user_data in sample_users:
-                if not User.objects.filter(email=user_data['email']).exists():
-                    password = 'password123'
-                    user = User.objects.create(
-                        first_name=user_data['first_name'],
-                        last_name=user_data['last_name'],
-                        email=user_data['email'],
-                        phone_number=user_data['phone_number'],
-                        role=user_data['role'],
-                        password=''
-                    )
-                    user.set_password(password)
-                    user.save()
-                    self.stdout.write(self.style.SUCCESS(f'Created user: {user.email} with password: {password}'))
-            
-            users = User.objects.all()
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        self.seed_users(options['users'], seed, options['batch_size'])
 
+        users = User.objects.all()
         drivers = users.filter(role='driver')
-        if drivers.count() == 0:
+        if not drivers.exists():
             drivers = users.filter(role__in=['driver', 'user'])[:3]
-        
-        riders = users.exclude(id_user__in=drivers.values_list('id_user', flat=True))
-        if riders.count() == 0:
+        driver_ids = list(drivers.values_list('id_user', flat=True))
+
+        riders = users.exclude(id_user__in=driver_ids)
+        if not riders.exists():
             riders = users.filter(role__in=['user', 'passenger'])[:5]
-        if riders.count() == 0:
+        if not riders.exists():
             riders = users.exclude(role='admin')[:5]
+        rider_ids = list(riders.values_list('id_user', flat=True))
 
-        self.stdout.write(self.style.SUCCESS('Creating sample rides...'))
-        
-        statuses = ['en-route', 'pickup', 'dropoff', 'completed', 'cancelled']
-        
-        sample_locations = [
-            {'pickup': (40.7128, -74.0060), 'dropoff': (40.7589, -73.9851)},
-            {'pickup': (40.7505, -73.9934), 'dropoff': (40.7282, -73.7949)},
-            {'pickup': (40.7614, -73.9776), 'dropoff': (40.6782, -73.9442)},
-            {'pickup': (40.7489, -73.9680), 'dropoff': (40.6892, -74.0445)},
-            {'pickup': (40.7282, -73.7949), 'dropoff': (40.7128, -74.0060)},
+        if not rider_ids or not driver_ids:
+            raise CommandError('Not enough users to create rides.')
+
+        rides_created, events_created = self.seed_rides(
+            options['rides'], options['events_per_ride'], rider_ids, driver_ids,
+            seed, options['batch_size'], options['workers']
+        )
+        # bulk_create skips the post_save signals that normally keep these up to date.
+        CountCache.bump('ride')
+        CountCache.bump('ride_event')
+        CountCache.bump('user')
+        ride_distance_index.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(f'Created {rides_created} rides and {events_created} ride events (seed {seed}).'))
+
+        self.stdout.write(self.style.SUCCESS(f'\nSeeding completed successfully!'))
+        self.stdout.write(self.style.SUCCESS(f'Total rides: {Ride.objects.count()}'))
+        self.stdout.write(self.style.SUCCESS(f'Total ride events: {RideEvent.objects.count()}'))
+
+    def clear(self):
+        # Plain DELETEs: with post_delete receivers attached, QuerySet.delete() loads every row and
+        # fires the per-row signals. The SQL triggers still keep the spatial and email indexes in
+        # sync; the derived state the signals would maintain is reset once below.
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for model in (RideEventArchive, RideEvent, Ride):
+                    cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+            RideStatusRollups.rebuild()
+        CountCache.bump('ride')
+        CountCache.bump('ride_event')
+        ride_distance_index.invalidate()
+
+    def seed_users(self, extra_users, seed, batch_size):
+        # One hash shared by every seeded user: PBKDF2 per row would dominate large seeds.
+        password_hash = make_password(SAMPLE_PASSWORD)
+        existing = set(User.objects.filter(email__in=[u['email'] for u in SAMPLE_USERS]).values_list('email', flat=True))
+        new_users = [User(password=password_hash, **data) for data in SAMPLE_USERS if data['email'] not in existing]
+        if new_users:
+            self.stdout.write(self.style.WARNING('Creating sample users...'))
+            User.objects.bulk_create(new_users)
+            for user in new_users:
+                self.stdout.write(self.style.SUCCESS(f'Created user: {user.email} with password: {SAMPLE_PASSWORD}'))
+
+        if extra_users <= 0:
+            return
+
+        self.stdout.write(self.style.WARNING(f'Creating {extra_users} generated users...'))
+        rng = random.Random(f'{seed}:users')
+        start = (User.objects.aggregate(Max('id_user'))['id_user__max'] or 0) + 1
+        for batch_start in range(0, extra_users, batch_size):
+            batch = []
+            for n in range(start + batch_start, start + min(batch_start + batch_size, extra_users)):
+                batch.append(User(
+                    first_name=f'Seed{n}',
+                    last_name='Driver' if n % 5 == 0 else 'Rider',
+                    email=f'seed.user{n}.{seed}@example.com',
+                    phone_number=f'{rng.randrange(10 ** 9, 10 ** 10)}',
+                    role='driver' if n % 5 == 0 else 'passenger',
+                    password=password_hash,
+                ))
+            with transaction.atomic():
+                User.objects.bulk_create(batch, batch_size=batch_size)
+
+    def seed_rides(self, total_rides, events_per_ride, rider_ids, driver_ids, seed, batch_size, workers):
+        if total_rides <= 0:
+            return 0, 0
+
+        self.stdout.write(self.style.SUCCESS('Creating sample rides and ride events...'))
+
+        # Ids are assigned up front so chunks can be generated independently and events can
+        # reference their ride without reading ids back from the database.
+        first_id = (Ride.objects.aggregate(Max('id_ride'))['id_ride__max'] or 0) + 1
+        now = timezone.now()
+        tasks = [
+            (seed, i, first_id + offset, min(batch_size, total_rides - offset), rider_ids, driver_ids, events_per_ride, now)
+            for i, offset in enumerate(range(0, total_rides, batch_size))
         ]
 
         rides_created = 0
-        for i in range(10):
-            if riders.count() == 0 or drivers.count() == 0:
-                break
-                
-            rider = random.choice(riders)
-            driver = random.choice(drivers)
-            
-            if rider.id_user == driver.id_user:
-                continue
-            
-            location = random.choice(sample_locations)
-            status = random.choice(statuses)
-            
-            pickup_time = timezone.now() - timedelta(
-                days=random.randint(0, 30),
-                hours=random.randint(0, 23),
-                minutes=random.randint(0, 59)
-            )
-            
-            ride = Ride.objects.create(
-                status=status,
-                id_rider=rider,
-                id_driver=driver,
-                pickup_latitude=location['pickup'][0],
-                pickup_longitude=location['pickup'][1],
-                dropoff_latitude=location['dropoff'][0],
-                dropoff_longitude=location['dropoff'][1],
-                pickup_time=pickup_time
+        events_created = 0
+        if workers > 1:
+            # Under spawn/forkserver a worker imports this module, and with it the models, before
+            # its first task: the apps must be set up there first.
+            with Pool(workers, initializer=django.setup) as pool:
+                for rides, events in pool.imap(generate_chunk, tasks):
+                    self.write_chunk(rides, events)
+                    rides_created += len(rides)
+                    events_created += len(events)
+                    self.stdout.write(f'  {rides_created}/{total_rides} rides written')
+        else:
+            for task in tasks:
+                rides, events = generate_chunk(task)
+                self.write_chunk(rides, events)
+                rides_created += len(rides)
+                events_created += len(events)
+                self.stdout.write(f'  {rides_created}/{total_rides} rides written')
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Ride, RideEvent]):
+                cursor.execute(sql)
+
+        return rides_created, events_created
+
+    def write_chunk(self, rides, events):
+        ride_objects = [
+            Ride(
+                id_ride=id_ride, status=status, id_rider_id=rider, id_driver_id=driver,
+                pickup_latitude=plat, pickup_longitude=plon, dropoff_latitude=dlat, dropoff_longitude=dlon,
+                pickup_time=pickup_time, pickup_event_at=pickup_event_at, dropoff_event_at=dropoff_event_at,
+                trip_duration_seconds=duration,
             )
-            rides_created += 1
-            
-            self.stdout.write(self.style.SUCCESS(f'Created ride #{ride.id_ride}: {rider.first_name} -> {driver.first_name} ({status})'))
-
-        self.stdout.write(self.style.SUCCESS('Creating sample ride events...'))
-        
-        rides = Ride.objects.all()
-        event_descriptions = [
-            'Ride requested',
-            'Driver assigned',
-            'Driver on the way',
-            'Driver arrived at pickup location',
-            'Passenger picked up',
-            'Ride in progress',
-            'Arrived at destination',
-            'Ride completed',
-            'Payment processed',
-            'Ride cancelled by passenger',
-            'Ride cancelled by driver',
+            for (id_ride, status, rider, driver, plat, plon, dlat, dlon,
+                 pickup_time, pickup_event_at, dropoff_event_at, duration) in rides
         ]
-        
-        events_created = 0
-        for ride in rides:
-            num_events = random.randint(2, 5)
-            event_time = ride.pickup_time
-            
-            for j in range(num_events):
-                description = random.choice(event_descriptions)
-                event_time = event_time + timedelta(minutes=random.randint(5, 30))
-                
-                if event_time > timezone.now():
-                    event_time = timezone.now() - timedelta(minutes=random.randint(1, 60))
-                
-                ride_event = RideEvent(
-                    id_ride=ride,
-                    description=description
-                )
-                ride_event.save()
-                RideEvent.objects.filter(id_ride_event=ride_event.id_ride_event).update(created_at=event_time)
-                
-                events_created += 1
-
-        self.stdout.write(self.style.SUCCESS(f'Created {events_created} ride events.'))
 
-        self.stdout.write(self.style.SUCCESS(f'\nSeeding completed successfully!'))
-        self.stdout.write(self.style.SUCCESS(f'Total rides: {Ride.objects.count()}'))
-        self.stdout.write(self.style.SUCCESS(f'Total ride events: {RideEvent.objects.count()}'))
+        event_objects = [
+            RideEvent(id_ride_id=id_ride, description=description, created_at=created_at)
+            for id_ride, description, created_at in events
+        ]
+
+        with transaction.atomic():
+            Ride.objects.bulk_create(ride_objects)
+            RideStatusRollups.rides_added((ride.status, ride.pickup_time) for ride in ride_objects)
+            # created_at defaults to now only when not given, so the backdated timestamps are kept.
+            RideEvent.objects.bulk_create(event_objects)
+        # Ids of deleted rides can be handed out again; bulk_create sends no post_save.
+        RideFragmentCache.invalidate('ride', (ride.id_ride for ride in ride_objects))
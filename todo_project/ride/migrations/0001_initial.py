@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-02-22 05:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ride',
+            fields=[
+                ('id_ride', models.AutoField(db_column='id_ride', primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('en-route', 'En Route'), ('pickup', 'Pickup'), ('dropoff', 'Dropoff'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='en-route', max_length=50)),
+                ('pickup_latitude', models.FloatField()),
+                ('pickup_longitude', models.FloatField()),
+                ('dropoff_latitude', models.FloatField()),
+                ('dropoff_longitude', models.FloatField()),
+                ('pickup_time', models.DateTimeField()),
+                ('id_driver', models.ForeignKey(db_column='id_driver', on_delete=django.db.models.deletion.CASCADE, related_name='rides_as_driver', to='user.user')),
+                ('id_rider', models.ForeignKey(db_column='id_rider', on_delete=django.db.models.deletion.CASCADE, related_name='rides_as_rider', to='user.user')),
+            ],
+            options={
+                'verbose_name': 'Ride',
+                'verbose_name_plural': 'Rides',
+                'db_table': 'ride',
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ride_spatial_index USING rtree(
+        id,
+        pickup_lat_min, pickup_lat_max,
+        pickup_lon_min, pickup_lon_max,
+        dropoff_lat_min, dropoff_lat_max,
+        dropoff_lon_min, dropoff_lon_max
+    )
+    """,
+    """
+    INSERT INTO ride_spatial_index
+    SELECT id_ride,
+           pickup_latitude, pickup_latitude, pickup_longitude, pickup_longitude,
+           dropoff_latitude, dropoff_latitude, dropoff_longitude, dropoff_longitude
+    FROM ride
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ride_spatial_index_insert AFTER INSERT ON ride
+    BEGIN
+        INSERT INTO ride_spatial_index VALUES (
+            NEW.id_ride,
+            NEW.pickup_latitude, NEW.pickup_latitude, NEW.pickup_longitude, NEW.pickup_longitude,
+            NEW.dropoff_latitude, NEW.dropoff_latitude, NEW.dropoff_longitude, NEW.dropoff_longitude
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ride_spatial_index_update
+    AFTER UPDATE OF pickup_latitude, pickup_longitude, dropoff_latitude, dropoff_longitude ON ride
+    BEGIN
+        UPDATE ride_spatial_index SET
+            pickup_lat_min = NEW.pickup_latitude, pickup_lat_max = NEW.pickup_latitude,
+            pickup_lon_min = NEW.pickup_longitude, pickup_lon_max = NEW.pickup_longitude,
+            dropoff_lat_min = NEW.dropoff_latitude, dropoff_lat_max = NEW.dropoff_latitude,
+            dropoff_lon_min = NEW.dropoff_longitude, dropoff_lon_max = NEW.dropoff_longitude
+        WHERE id = NEW.id_ride;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ride_spatial_index_delete AFTER DELETE ON ride
+    BEGIN
+        DELETE FROM ride_spatial_index WHERE id = OLD.id_ride;
+    END
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS ride_spatial_index_delete',
+    'DROP TRIGGER IF EXISTS ride_spatial_index_update',
+    'DROP TRIGGER IF EXISTS ride_spatial_index_insert',
+    'DROP TABLE IF EXISTS ride_spatial_index',
+]
+
+
+def create_spatial_index(apps, schema_editor):
+    # R*Tree is a SQLite module; other backends fall back to plain range filters.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_spatial_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ride', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_spatial_index, drop_spatial_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ride', '0003_ride_trip_times'),
+        ('user', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['pickup_time', 'id_ride'], name='ride_pickup_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['status', 'pickup_time', 'id_ride'], name='ride_status_pickup_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['id_rider', 'pickup_time'], name='ride_rider_pickup_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['id_driver', 'pickup_time'], name='ride_driver_pickup_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['trip_duration_seconds', 'id_ride'], name='ride_trip_duration_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:20
+
+from datetime import timezone as dt_timezone
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+
+def build_rollups(apps, schema_editor):
+    Ride = apps.get_model('ride', 'Ride')
+    RideStatusRollup = apps.get_model('ride', 'RideStatusRollup')
+    rows = Ride.objects.annotate(
+        hour=TruncHour('pickup_time', tzinfo=dt_timezone.utc)
+    ).values('status', 'hour').annotate(count=Count('id_ride')).order_by()
+    RideStatusRollup.objects.bulk_create(
+        [RideStatusRollup(status=row['status'], hour=row['hour'], count=row['count']) for row in rows],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ride', '0004_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RideStatusRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('en-route', 'En Route'), ('pickup', 'Pickup'), ('dropoff', 'Dropoff'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=50)),
+                ('hour', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Ride Status Rollup',
+                'verbose_name_plural': 'Ride Status Rollups',
+                'db_table': 'ride_status_rollup',
+                'constraints': [models.UniqueConstraint(fields=('hour', 'status'), name='ride_status_rollup_hour_status_uniq')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ride', '0005_ride_status_rollup'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='ridestatusrollup',
+            old_name='id',
+            new_name='id_ride_status_rollup',
+        ),
+        migrations.AlterField(
+            model_name='ridestatusrollup',
+            name='id_ride_status_rollup',
+            field=models.AutoField(db_column='id_ride_status_rollup', primary_key=True, serialize=False),
+        ),
+    ]
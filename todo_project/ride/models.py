@@ -21,6 +21,19 @@ class Ride(models.Model):
     dropoff_latitude = models.FloatField()
     dropoff_longitude = models.FloatField()
     pickup_time = models.DateTimeField()
+    # Denormalized from the ride's "Status changed to pickup/dropoff" events (see ride_event/signals.py).
+    pickup_event_at = models.DateTimeField(null=True, blank=True)
+    dropoff_event_at = models.DateTimeField(null=True, blank=True)
+    trip_duration_seconds = models.IntegerField(null=True, blank=True)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the (status, pickup_time) the status rollups currently count this ride under.
+        loaded = dict(zip(field_names, values))
+        if 'status' in loaded and 'pickup_time' in loaded:
+            instance._rollup_state = (loaded['status'], loaded['pickup_time'])
+        return instance
     
     def to_serializer_data(self):
         from ride.serializers import RideSerializer
@@ -31,10 +44,38 @@ class Ride(models.Model):
         db_table = 'ride'
         verbose_name = 'Ride'
         verbose_name_plural = 'Rides'
+        indexes = [
+            # Default list ordering and the (pickup_time, id_ride) keyset cursor.
+            models.Index(fields=['pickup_time', 'id_ride'], name='ride_pickup_time_idx'),
+            models.Index(fields=['status', 'pickup_time', 'id_ride'], name='ride_status_pickup_time_idx'),
+            models.Index(fields=['id_rider', 'pickup_time'], name='ride_rider_pickup_time_idx'),
+            models.Index(fields=['id_driver', 'pickup_time'], name='ride_driver_pickup_time_idx'),
+            models.Index(fields=['trip_duration_seconds', 'id_ride'], name='ride_trip_duration_idx'),
+        ]
     
     def __str__(self):
         return f"Ride #{self.id_ride} - {self.status} (Rider: {self.id_rider}, Driver: {self.id_driver})"
     
     @property
     def serialized(self):
-        return self.to_serializer_data()
\ No newline at end of file
+        return self.to_serializer_data()
+
+
+class RideStatusRollup(models.Model):
+    """Number of rides per status and pickup hour (UTC), kept up to date by ride/signals.py."""
+    
+    id_ride_status_rollup = models.AutoField(primary_key=True, db_column='id_ride_status_rollup')
+    status = models.CharField(max_length=50, choices=Ride.STATUS_CHOICES)
+    hour = models.DateTimeField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'ride_status_rollup'
+        verbose_name = 'Ride Status Rollup'
+        verbose_name_plural = 'Ride Status Rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'status'], name='ride_status_rollup_hour_status_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.status} @ {self.hour:%Y-%m-%d %H:00}: {self.count}"
@@ -0,0 +1,104 @@
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, Optional, Tuple
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncHour
+from ride.models import Ride, RideStatusRollup
+from todo_project.database import read_only
+
+
+RollupKey = Tuple[str, datetime]
+
+
+class RideStatusRollups:
+    """
+    Ride counts per (status, pickup hour in UTC) in the `ride_status_rollup` table.
+
+    Ride saves and deletes apply +1/-1 deltas to the affected buckets (see ride/signals.py), so
+    reading a day of statistics is a range read of at most 24 rows per status. `rebuild()`
+    recomputes the table from the `ride` table after writes that bypass signals.
+    """
+
+    @staticmethod
+    def hour_bucket(value: datetime) -> datetime:
+        return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def day_bucket(cls, value: datetime) -> datetime:
+        return cls.hour_bucket(value).replace(hour=0)
+
+    @classmethod
+    def key(cls, status: str, pickup_time: datetime) -> RollupKey:
+        return status, cls.hour_bucket(pickup_time)
+
+    @staticmethod
+    def apply(deltas: Dict[RollupKey, int]):
+        for (status, hour), delta in deltas.items():
+            if not delta:
+                continue
+            updated = RideStatusRollup.objects.filter(status=status, hour=hour).update(count=F('count') + delta)
+            if updated:
+                continue
+            try:
+                with transaction.atomic():
+                    RideStatusRollup.objects.create(status=status, hour=hour, count=delta)
+            except IntegrityError:
+                # Created concurrently by another writer.
+                RideStatusRollup.objects.filter(status=status, hour=hour).update(count=F('count') + delta)
+
+    @classmethod
+    def ride_changed(cls, old: Optional[Tuple[str, datetime]], new: Optional[Tuple[str, datetime]]):
+        """Move one ride between buckets; `old`/`new` are (status, pickup_time), None when absent."""
+        deltas = Counter()
+        if old is not None:
+            deltas[cls.key(*old)] -= 1
+        if new is not None:
+            deltas[cls.key(*new)] += 1
+        cls.apply(deltas)
+
+    @classmethod
+    def rides_added(cls, rides: Iterable[Tuple[str, datetime]]):
+        """Count rides inserted without signals (bulk_create), given as (status, pickup_time)."""
+        cls.apply(Counter(cls.key(status, pickup_time) for status, pickup_time in rides))
+
+    @staticmethod
+    def rebuild() -> int:
+        rows = Ride.objects.annotate(
+            hour=TruncHour('pickup_time', tzinfo=dt_timezone.utc)
+        ).values('status', 'hour').annotate(count=Count('id_ride')).order_by()
+        rollups = [RideStatusRollup(status=row['status'], hour=row['hour'], count=row['count']) for row in rows]
+        with transaction.atomic():
+            RideStatusRollup.objects.all().delete()
+            RideStatusRollup.objects.bulk_create(rollups, batch_size=1000)
+        return len(rollups)
+
+    @classmethod
+    @read_only
+    def stats(cls, start: datetime, end: datetime, status: str = None, bucket: str = 'hour') -> dict:
+        """Counts per bucket and status for rides picked up in [start, end), plus totals per status."""
+        queryset = RideStatusRollup.objects.filter(
+            hour__gte=cls.hour_bucket(start), hour__lt=end, count__gt=0
+        ).order_by('hour', 'status')
+        if status:
+            queryset = queryset.filter(status=status)
+
+        counts = Counter()
+        totals = Counter()
+        for row_status, hour, count in queryset.values_list('status', 'hour', 'count'):
+            if bucket == 'day':
+                hour = hour.replace(hour=0)
+            counts[(hour, row_status)] += count
+            totals[row_status] += count
+
+        return {
+            'results': [
+                {bucket: period.isoformat(), 'status': row_status, 'count': count}
+                for (period, row_status), count in sorted(counts.items())
+            ],
+            'totals': {
+                row_status: totals.get(row_status, 0)
+                for row_status, _ in Ride.STATUS_CHOICES
+                if not status or row_status == status
+            },
+        }
@@ -1,39 +1,45 @@
-from typing import Union, List
+import asyncio
+from itertools import islice
+from typing import Iterator, Union, List
+from django.db import connections
 from django.db.models import QuerySet, Prefetch
 from django.utils import timezone
 from datetime import timedelta, datetime
 from ride.models import Ride
-from ride_event.models import RideEvent
-from ride.utils import haversine_distance
+from ride_event.models import RideEvent, RideEventArchive
+from ride.distance_index import ride_distance_index
+from ride.spatial import RideSpatialIndex
+from ride.fast_serializer import RideFastSerializer, RideShape
+from ride.fragment_cache import RideFragmentCache
+from user.models import User
+from user.email_search import UserEmailSearch
+from todo_project.pagination import KeysetPaginator
+from todo_project.count_cache import CountCache
+from todo_project.async_utils import run_db_concurrently
+from todo_project.database import read_only
 
 
 class RideService:
     
     @staticmethod
     def _parse_datetime_string(datetime_str: str):
-        """Parse various datetime string formats."""
+        """
+        Parse an ISO 8601 date or datetime in a single pass: '2026-02-16', '2026-02-16 01:00:24',
+        '2026-02-16T01:00:24.300705', '2026-02-16T01:00:24Z', '2026-02-16T01:00:24+02:00', ...
+        Values without an offset are in the current timezone; returns None when it is not a datetime.
+        """
         if not datetime_str:
             return None
         
-        # Try multiple datetime formats
-        formats = [
-            '%Y-%m-%d %H:%M:%S.%f',  # 2026-02-16 01:00:24.300705
-            '%Y-%m-%d %H:%M:%S',     # 2026-02-16 01:00:24
-            '%Y-%m-%dT%H:%M:%S.%f',  # 2026-02-16T01:00:24.300705
-            '%Y-%m-%dT%H:%M:%S',     # 2026-02-16T01:00:24
-            '%Y-%m-%d',              # 2026-02-16
-        ]
-        
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(datetime_str, fmt)
-                # Make timezone-aware
-                dt = timezone.make_aware(dt)
-                return dt
-            except ValueError:
-                continue
+        try:
+            dt = datetime.fromisoformat(datetime_str.strip())
+        except ValueError:
+            return None
         
-        return None
+        # Make timezone-aware
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt)
+        return dt
     
     @staticmethod
     def _parse_order(order: str) -> bool:
@@ -50,50 +56,63 @@ class RideService:
             return True  # Default to descending if invalid
     
     @staticmethod
-    def _build_queryset(status: str = None, email: str = None, sort_by: str = None, order: str = 'desc') -> QuerySet:
-        yesterday = timezone.now() - timedelta(hours=24)
-        todays_events_prefetch = Prefetch(
-            'rideevent_set',
-            queryset=RideEvent.objects.filter(created_at__gte=yesterday).order_by('created_at'),
-            to_attr='todays_events'
-        )
-        queryset = Ride.objects.select_related('id_rider', 'id_driver').prefetch_related(todays_events_prefetch).all()
+    def _pickup_window(anchor: datetime = None, is_descending: bool = True, pickup_from: datetime = None,
+                       pickup_to: datetime = None) -> dict:
+        """
+        pickup_time range lookups for `from`/`to` ([from, to)) and a datetime `sort` anchor, which seeks
+        to that instant: rides at or before it going backwards (desc), at or after it going forwards (asc).
+        """
+        window = {}
+        if pickup_from:
+            window['pickup_time__gte'] = pickup_from
+        if pickup_to:
+            window['pickup_time__lt'] = pickup_to
+        if anchor:
+            if is_descending:
+                window['pickup_time__lte'] = anchor
+            else:
+                window['pickup_time__gte'] = max(anchor, pickup_from) if pickup_from else anchor
+        return window
+    
+    @staticmethod
+    def _build_queryset(status: str = None, email: str = None, sort_by: str = None, order: str = 'desc',
+                        pickup_from: datetime = None, pickup_to: datetime = None) -> QuerySet:
+        # Rows are serialized from values() by RideFastSerializer, so no select_related/prefetch here.
+        queryset = Ride.objects.all()
         
         if status:
             queryset = queryset.filter(status=status)
         
         if email:
-            queryset = queryset.filter(id_rider__email__icontains=email)
+            # Matching riders come from the email search index; the rides then via ride.id_rider.
+            queryset = queryset.filter(id_rider__in=UserEmailSearch.matching_user_ids(email))
         
         is_descending = RideService._parse_order(order)
         
-        # Check if sort_by is a datetime string
-        datetime_parse_result = RideService._parse_datetime_string(sort_by) if sort_by else None
+        # A datetime sort is a seek anchor: a range on pickup_time, walked in `order` from that instant.
+        anchor = RideService._parse_datetime_string(sort_by) if sort_by else None
+        window = RideService._pickup_window(anchor, is_descending, pickup_from, pickup_to)
+        if window:
+            queryset = queryset.filter(**window)
         
-        if datetime_parse_result:
-            # Sort by pickup_time (datetime provided indicates pickup_time sorting)
-            if is_descending:
-                queryset = queryset.order_by('-pickup_time')
-            else:
-                queryset = queryset.order_by('pickup_time')
-        elif sort_by == 'pickup_time':
-            if is_descending:
-                queryset = queryset.order_by('-pickup_time')
-            else:
-                queryset = queryset.order_by('pickup_time')
+        # Same order as the keyset paginator, so adding `cursor=` never changes it.
+        if is_descending:
+            queryset = queryset.order_by('-pickup_time', '-id_ride')
         else:
-            queryset = queryset.order_by('-pickup_time')
+            queryset = queryset.order_by('pickup_time', 'id_ride')
         
         return queryset
     
     @staticmethod
-    def _sort_by_distance(rides: List[Ride], lat: float, lon: float, reverse: bool = False) -> List[Ride]:
-        rides_with_distance = [
-            (ride, haversine_distance(lat, lon, ride.pickup_latitude, ride.pickup_longitude))
-            for ride in rides
-        ]
-        rides_with_distance.sort(key=lambda x: x[1], reverse=reverse)
-        return [ride for ride, _ in rides_with_distance]
+    def _apply_spatial_filters(queryset: QuerySet, lat: float = None, lon: float = None, within_km: float = None,
+                               bbox: tuple = None, dropoff_bbox: tuple = None) -> QuerySet:
+        if within_km is not None and lat is not None and lon is not None:
+            queryset = RideSpatialIndex.filter_within_km(queryset, lat, lon, within_km)
+        if bbox:
+            queryset = RideSpatialIndex.filter_bbox(queryset, bbox, target='pickup')
+        if dropoff_bbox:
+            queryset = RideSpatialIndex.filter_bbox(queryset, dropoff_bbox, target='dropoff')
+        return queryset
     
     @classmethod
     def get_base_queryset(cls) -> QuerySet:
@@ -105,85 +124,338 @@ class RideService:
         )
         return Ride.objects.select_related('id_rider', 'id_driver').prefetch_related(todays_events_prefetch).all()
     
+    @staticmethod
+    def _count_rides(queryset: QuerySet, status: str = None, email: str = None, lat: float = None, lon: float = None,
+                     within_km: float = None, bbox: tuple = None, dropoff_bbox: tuple = None,
+                     pickup_window: dict = None, estimate_count: bool = False) -> int:
+        count_filters = {'status': status, 'email': email, 'bbox': bbox, 'dropoff_bbox': dropoff_bbox, **(pickup_window or {})}
+        if within_km is not None and lat is not None and lon is not None:
+            count_filters.update({'within_km': within_km, 'lat': lat, 'lon': lon})
+        return CountCache.count(
+            'rides', queryset, filters=count_filters,
+            depends_on=('ride', 'user') if email else ('ride',), estimate=estimate_count
+        )
+    
+    NEAREST_VERIFY_CHUNK = 500
+    
     @classmethod
+    def _nearest_matching(cls, queryset: QuerySet, expected: int, lat: float, lon: float, offset: int,
+                          limit: int, descending: bool, rider_ids: set = None, ride_ids: set = None) -> List[int]:
+        """
+        Ids of one page of `queryset` rides (`expected` of them in all) by distance.
+        
+        The distance index ranks the candidates (`ride_ids`, read from SQL, when status, spatial
+        or time filters apply), but its rider column can lag behind writes made by other
+        processes. Every filter is therefore checked against `queryset` in SQL, in rank order.
+        Enough candidates are ranked for the expected share of matches to fill the page; more
+        are ranked when that falls short.
+        """
+        wanted = offset + limit
+        if ride_ids is not None:
+            candidates = len(ride_ids)
+        elif rider_ids is None:
+            candidates = ride_distance_index.size()
+        else:
+            candidates = expected
+        fetch = int(wanted * candidates / max(expected, 1) * 1.25) + limit
+        verified = {}
+        while True:
+            ranked, candidates = ride_distance_index.nearest(
+                lat, lon, offset=0, limit=fetch, descending=descending, rider_ids=rider_ids, ride_ids=ride_ids
+            )
+            matched = []
+            for start in range(0, len(ranked), cls.NEAREST_VERIFY_CHUNK):
+                chunk = ranked[start:start + cls.NEAREST_VERIFY_CHUNK]
+                unknown = [id_ride for id_ride in chunk if id_ride not in verified]
+                if unknown:
+                    found = set(queryset.filter(id_ride__in=unknown).values_list('id_ride', flat=True))
+                    verified.update((id_ride, id_ride in found) for id_ride in unknown)
+                matched.extend(id_ride for id_ride in chunk if verified[id_ride])
+                if len(matched) >= wanted:
+                    return matched[offset:wanted]
+            if len(ranked) >= candidates:
+                return matched[offset:wanted]
+            # Fewer matches than expected: rank enough for the share seen so far, at least twice as many.
+            fetch = max(fetch * 2, int(wanted * len(ranked) / max(len(matched), 1) * 1.25))
+    
+    @classmethod
+    @read_only
     def get_filtered_and_sorted_rides(cls, status: str = None, email: str = None, 
                                       sort_by: str = None, order: str = 'desc', lat: float = None, lon: float = None,
-                                      page: int = 1, page_size: int = 10) -> dict:
+                                      page: int = 1, page_size: int = 10, within_km: float = None,
+                                      bbox: tuple = None, dropoff_bbox: tuple = None, cursor: str = None,
+                                      estimate_count: bool = False, pickup_from: datetime = None,
+                                      pickup_to: datetime = None, shape: RideShape = None,
+                                      as_fragments: bool = False) -> dict:
+        """
+        One page of rides. With `as_fragments=True` the results are the rides' rendered JSON
+        (bytes) from RideFragmentCache, and only rides without a cached fragment are serialized.
+        """
         offset = (page - 1) * page_size
+        if as_fragments:
+            values_fields = RideFragmentCache.ROW_FIELDS
+            serialize_rows = lambda rows: RideFragmentCache.fragments(rows, shape)
+        else:
+            values_fields = RideFastSerializer.values_fields(shape)
+            serialize_rows = lambda rows: RideFastSerializer.serialize_rows(rows, shape=shape)
         
         is_descending = cls._parse_order(order)
-        
-        queryset = cls._build_queryset(status=status, email=email, sort_by=sort_by, order=order)
+        has_spatial_filter = (within_km is not None and lat is not None and lon is not None) or bbox or dropoff_bbox
         
         if sort_by == 'distance' and lat is not None and lon is not None:
-            all_rides = list(queryset)
-            sorted_rides = cls._sort_by_distance(all_rides, lat, lon, reverse=is_descending)
-            total_count = len(sorted_rides)
-            paginated_rides = sorted_rides[offset:offset + page_size]
+            pickup_window = cls._pickup_window(pickup_from=pickup_from, pickup_to=pickup_to)
+            queryset = cls._build_queryset(
+                status=status, email=email, pickup_from=pickup_from, pickup_to=pickup_to
+            ).order_by()
+            if has_spatial_filter:
+                queryset = cls._apply_spatial_filters(
+                    queryset, lat=lat, lon=lon, within_km=within_km, bbox=bbox, dropoff_bbox=dropoff_bbox
+                )
+            total_count = cls._count_rides(
+                queryset, status=status, email=email, lat=lat, lon=lon, within_km=within_km, bbox=bbox,
+                dropoff_bbox=dropoff_bbox, pickup_window=pickup_window, estimate_count=estimate_count
+            )
+            rider_ids = None
+            ride_ids = None
+            if status or has_spatial_filter or pickup_window:
+                # One query on the indexed columns; only the matching rides are ranked.
+                ride_ids = set(queryset.values_list('id_ride', flat=True))
+            elif email:
+                rider_ids = set(User.objects.filter(
+                    id_user__in=UserEmailSearch.matching_user_ids(email)
+                ).values_list('id_user', flat=True))
+            page_ids = cls._nearest_matching(
+                queryset, total_count, lat, lon, offset=offset, limit=page_size, descending=is_descending,
+                rider_ids=rider_ids, ride_ids=ride_ids
+            )
+            rows_by_id = {
+                row['id_ride']: row for row in Ride.objects.filter(id_ride__in=page_ids).values(*values_fields)
+            }
             return {
-                'results': paginated_rides,
+                'results': serialize_rows([rows_by_id[id_ride] for id_ride in page_ids if id_ride in rows_by_id]),
                 'count': total_count,
                 'page': page,
                 'page_size': page_size,
                 'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0
             }
         
-        total_count = queryset.count()
-        rides = list(queryset[offset:offset + page_size])
+        queryset = cls._build_queryset(
+            status=status, email=email, sort_by=sort_by, order=order, pickup_from=pickup_from, pickup_to=pickup_to
+        )
+        if has_spatial_filter:
+            queryset = cls._apply_spatial_filters(
+                queryset, lat=lat, lon=lon, within_km=within_km, bbox=bbox, dropoff_bbox=dropoff_bbox
+            )
+        
+        if cursor is not None:
+            paginator = KeysetPaginator(('pickup_time', 'id_ride'), descending=is_descending)
+            result = paginator.paginate(queryset.values(*values_fields), cursor, page_size)
+            result['results'] = serialize_rows(result['results'])
+            result['page_size'] = page_size
+            return result
+        
+        total_count = cls._count_rides(
+            queryset, status=status, email=email, lat=lat, lon=lon, within_km=within_km, bbox=bbox,
+            dropoff_bbox=dropoff_bbox, pickup_window=cls._pickup_window(
+                cls._parse_datetime_string(sort_by), is_descending, pickup_from, pickup_to
+            ), estimate_count=estimate_count
+        )
+        rows = list(queryset.values(*values_fields)[offset:offset + page_size])
         
         return {
-            'results': rides,
+            'results': serialize_rows(rows),
             'count': total_count,
             'page': page,
             'page_size': page_size,
             'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0
         }
     
+    @classmethod
+    @read_only
+    def export_rides(cls, status: str = None, email: str = None, sort_by: str = None, order: str = 'desc',
+                     pickup_from: datetime = None, pickup_to: datetime = None,
+                     chunk_size: int = 1000) -> Iterator[List[dict]]:
+        """
+        Yield every matching ride, serialized, in chunks of `chunk_size`.
+        
+        Rows are read with a chunked `iterator()` and each chunk's events (all of them, archived
+        ones included, under `ride_events`) are fetched in one query, so memory use does not grow
+        with the export size.
+        """
+        queryset = cls._build_queryset(
+            status=status, email=email, sort_by=sort_by, order=order, pickup_from=pickup_from, pickup_to=pickup_to
+        )
+        rows = queryset.values(*RideFastSerializer.values_fields()).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            events_by_ride = RideFastSerializer.events([row['id_ride'] for row in chunk], include_archive=True)
+            rides = RideFastSerializer.serialize_rows(chunk, events_by_ride={})
+            for ride in rides:
+                del ride[RideFastSerializer.EVENTS_FIELD]
+                ride['ride_events'] = events_by_ride.get(ride['id_ride'], [])
+            yield rides
+    
     @staticmethod
-    def get_rides_with_duration(page: int = 1, page_size: int = 10) -> dict:
+    def refresh_trip_times(ride_ids) -> int:
+        """
+        Recompute pickup_event_at, dropoff_event_at and trip_duration_seconds for the given
+        rides from their pickup/dropoff events, archived ones included (the latest event of
+        each kind wins).
+        """
+        ride_ids = list(ride_ids)
+        times = {id_ride: {'pickup': None, 'dropoff': None} for id_ride in ride_ids}
+        trip_filter = {
+            'id_ride__in': ride_ids,
+            'description__in': [RideEvent.PICKUP_DESCRIPTION, RideEvent.DROPOFF_DESCRIPTION],
+        }
+        fields = ('id_ride_event', 'id_ride', 'description', 'created_at')
+        events = RideEvent.objects.filter(**trip_filter).values_list(*fields).union(
+            RideEventArchive.objects.filter(**trip_filter).values_list(*fields), all=True
+        ).order_by('id_ride_event')
+        for _, id_ride, description, created_at in events:
+            kind = 'pickup' if description == RideEvent.PICKUP_DESCRIPTION else 'dropoff'
+            times[id_ride][kind] = created_at
+        
+        rides = []
+        for id_ride, ride_times in times.items():
+            pickup_at = ride_times['pickup']
+            dropoff_at = ride_times['dropoff']
+            duration = int((dropoff_at - pickup_at).total_seconds()) if pickup_at and dropoff_at else None
+            rides.append(Ride(
+                id_ride=id_ride, pickup_event_at=pickup_at, dropoff_event_at=dropoff_at, trip_duration_seconds=duration
+            ))
+        updated = Ride.objects.bulk_update(rides, ['pickup_event_at', 'dropoff_event_at', 'trip_duration_seconds'])
+        # bulk_update sends no post_save.
+        RideFragmentCache.invalidate('ride', ride_ids)
+        return updated
+    
+    DURATION_FIELDS = ('pickup_event_at', 'dropoff_event_at', 'trip_duration_seconds')
+    
+    @staticmethod
+    def _with_durations(rows: List[dict], todays_events: dict = None, shape: RideShape = None) -> List[dict]:
+        rides = RideFastSerializer.serialize_rows(rows, events_by_ride=todays_events, shape=shape)
+        
+        for row, ride_data in zip(rows, rides):
+            pickup_at = row['pickup_event_at']
+            dropoff_at = row['dropoff_event_at']
+            duration_seconds = row['trip_duration_seconds']
+            
+            ride_data['trip_duration_minutes'] = int(duration_seconds / 60) if duration_seconds is not None else None
+            ride_data['pickup_event_time'] = pickup_at.isoformat() if pickup_at else None
+            ride_data['dropoff_event_time'] = dropoff_at.isoformat() if dropoff_at else None
+        
+        return rides
+    
+    @classmethod
+    def _duration_queryset(cls, sort_by: str = None, order: str = 'desc', min_duration: int = None,
+                           max_duration: int = None) -> tuple:
+        """Returns (queryset, keyset fields) for with_duration; durations are given in minutes."""
+        is_descending = cls._parse_order(order)
+        queryset = Ride.objects.all()
+        if min_duration is not None:
+            queryset = queryset.filter(trip_duration_seconds__gte=min_duration * 60)
+        if max_duration is not None:
+            queryset = queryset.filter(trip_duration_seconds__lte=max_duration * 60)
+        
+        if sort_by == 'duration':
+            keyset_fields = ('trip_duration_seconds', 'id_ride')
+            queryset = queryset.filter(trip_duration_seconds__isnull=False)
+        else:
+            keyset_fields = ('pickup_time', 'id_ride')
+            is_descending = True
+        
+        prefix = '-' if is_descending else ''
+        return queryset.order_by(*(f'{prefix}{name}' for name in keyset_fields)), keyset_fields, is_descending
+    
+    @classmethod
+    @read_only
+    def get_rides_with_duration(cls, page: int = 1, page_size: int = 10, cursor: str = None,
+                                estimate_count: bool = False, sort_by: str = None, order: str = 'desc',
+                                min_duration: int = None, max_duration: int = None, shape: RideShape = None) -> dict:
         offset = (page - 1) * page_size
+        values_fields = RideFastSerializer.values_fields(shape, extra=cls.DURATION_FIELDS)
         
-        yesterday = timezone.now() - timedelta(hours=24)
-        todays_events_prefetch = Prefetch(
-            'rideevent_set',
-            queryset=RideEvent.objects.filter(created_at__gte=yesterday).order_by('created_at'),
-            to_attr='todays_events'
+        queryset, keyset_fields, is_descending = cls._duration_queryset(
+            sort_by=sort_by, order=order, min_duration=min_duration, max_duration=max_duration
         )
-        queryset = Ride.objects.select_related('id_rider', 'id_driver').prefetch_related(todays_events_prefetch).all().order_by('-pickup_time')
-        total_count = queryset.count()
-        
-        rides = list(queryset[offset:offset + page_size])
-        
-        ride_ids = [ride.id_ride for ride in rides]
-        all_events = RideEvent.objects.filter(id_ride__in=ride_ids).select_related('id_ride')
-        
-        events_by_ride = {}
-        for event in all_events:
-            if event.id_ride_id not in events_by_ride:
-                events_by_ride[event.id_ride_id] = {'pickup': None, 'dropoff': None}
-            if event.description == 'Status changed to pickup':
-                events_by_ride[event.id_ride_id]['pickup'] = event
-            elif event.description == 'Status changed to dropoff':
-                events_by_ride[event.id_ride_id]['dropoff'] = event
-        
-        results = []
-        for ride in rides:
-            ride_events = events_by_ride.get(ride.id_ride, {'pickup': None, 'dropoff': None})
-            pickup_event = ride_events['pickup']
-            dropoff_event = ride_events['dropoff']
-            
-            ride_data = ride.serialized
-            
-            if pickup_event and dropoff_event:
-                duration = dropoff_event.created_at - pickup_event.created_at
-                ride_data['trip_duration_minutes'] = int(duration.total_seconds() / 60)
-            else:
-                ride_data['trip_duration_minutes'] = None
-            
-            ride_data['pickup_event_time'] = pickup_event.created_at.isoformat() if pickup_event else None
-            ride_data['dropoff_event_time'] = dropoff_event.created_at.isoformat() if dropoff_event else None
-            
-            results.append(ride_data)
+        
+        if cursor is not None:
+            paginator = KeysetPaginator(keyset_fields, descending=is_descending)
+            result = paginator.paginate(queryset.values(*values_fields), cursor, page_size)
+            result['results'] = cls._with_durations(result['results'], shape=shape)
+            result['page_size'] = page_size
+            return result
+        
+        total_count = CountCache.count(
+            'rides_with_duration', queryset, depends_on=('ride',), estimate=estimate_count,
+            filters={'duration_sorted': sort_by == 'duration', 'min_duration': min_duration, 'max_duration': max_duration}
+        )
+        
+        rows = list(queryset.values(*values_fields)[offset:offset + page_size])
+        
+        return {
+            'results': cls._with_durations(rows, shape=shape),
+            'count': total_count,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0
+        }
+    
+    @staticmethod
+    def _page_ids_subquery(queryset: QuerySet, offset: int, page_size: int):
+        """The page's ride ids as a subquery, or None when the backend cannot slice inside IN."""
+        if not connections[queryset.db].features.allow_sliced_subqueries_with_in:
+            return None
+        return queryset.values('id_ride')[offset:offset + page_size]
+    
+    @classmethod
+    @read_only
+    async def aget_filtered_and_sorted_rides(cls, status: str = None, email: str = None,
+                                             sort_by: str = None, order: str = 'desc', lat: float = None, lon: float = None,
+                                             page: int = 1, page_size: int = 10, within_km: float = None,
+                                             bbox: tuple = None, dropoff_bbox: tuple = None, cursor: str = None,
+                                             estimate_count: bool = False, pickup_from: datetime = None,
+                                             pickup_to: datetime = None, shape: RideShape = None) -> dict:
+        """Async get_filtered_and_sorted_rides: the count, page and events queries are issued concurrently."""
+        if cursor is not None or (sort_by == 'distance' and lat is not None and lon is not None):
+            # Cursor pages need no count and distance pages come from the in-memory index.
+            return await run_db_concurrently(
+                cls.get_filtered_and_sorted_rides, status=status, email=email, sort_by=sort_by, order=order,
+                lat=lat, lon=lon, page=page, page_size=page_size, within_km=within_km, bbox=bbox,
+                dropoff_bbox=dropoff_bbox, cursor=cursor, estimate_count=estimate_count,
+                pickup_from=pickup_from, pickup_to=pickup_to, shape=shape
+            )
+        
+        offset = (page - 1) * page_size
+        queryset = cls._apply_spatial_filters(
+            cls._build_queryset(
+                status=status, email=email, sort_by=sort_by, order=order, pickup_from=pickup_from, pickup_to=pickup_to
+            ),
+            lat=lat, lon=lon, within_km=within_km, bbox=bbox, dropoff_bbox=dropoff_bbox
+        )
+        page_queryset = queryset.values(*RideFastSerializer.values_fields(shape))[offset:offset + page_size]
+        wants_events = shape is None or shape.events
+        page_ids = cls._page_ids_subquery(queryset, offset, page_size) if wants_events else None
+        
+        queries = [
+            run_db_concurrently(
+                cls._count_rides, queryset, status=status, email=email, lat=lat, lon=lon, within_km=within_km,
+                bbox=bbox, dropoff_bbox=dropoff_bbox, pickup_window=cls._pickup_window(
+                    cls._parse_datetime_string(sort_by), cls._parse_order(order), pickup_from, pickup_to
+                ), estimate_count=estimate_count
+            ),
+            run_db_concurrently(list, page_queryset),
+        ]
+        if page_ids is not None:
+            queries.append(run_db_concurrently(RideFastSerializer.todays_events, page_ids))
+        total_count, rows, *events = await asyncio.gather(*queries)
+        
+        if events or not wants_events:
+            results = RideFastSerializer.serialize_rows(rows, events_by_ride=events[0] if events else None, shape=shape)
+        else:
+            results = await run_db_concurrently(RideFastSerializer.serialize_rows, rows, shape=shape)
         
         return {
             'results': results,
@@ -192,3 +464,41 @@ class RideService:
             'page_size': page_size,
             'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0
         }
+    
+    @classmethod
+    @read_only
+    async def aget_rides_with_duration(cls, page: int = 1, page_size: int = 10, cursor: str = None,
+                                       estimate_count: bool = False, sort_by: str = None, order: str = 'desc',
+                                       min_duration: int = None, max_duration: int = None, shape: RideShape = None) -> dict:
+        """Async get_rides_with_duration: the count, page and events queries are issued concurrently."""
+        queryset, _, _ = cls._duration_queryset(
+            sort_by=sort_by, order=order, min_duration=min_duration, max_duration=max_duration
+        )
+        offset = (page - 1) * page_size
+        page_ids = cls._page_ids_subquery(queryset, offset, page_size)
+        
+        if cursor is not None or page_ids is None or (shape is not None and not shape.events):
+            return await run_db_concurrently(
+                cls.get_rides_with_duration, page=page, page_size=page_size, cursor=cursor,
+                estimate_count=estimate_count, sort_by=sort_by, order=order,
+                min_duration=min_duration, max_duration=max_duration, shape=shape
+            )
+        
+        total_count, rows, todays_events = await asyncio.gather(
+            run_db_concurrently(
+                CountCache.count, 'rides_with_duration', queryset, depends_on=('ride',), estimate=estimate_count,
+                filters={'duration_sorted': sort_by == 'duration', 'min_duration': min_duration, 'max_duration': max_duration}
+            ),
+            run_db_concurrently(list, queryset.values(
+                *RideFastSerializer.values_fields(shape, extra=cls.DURATION_FIELDS)
+            )[offset:offset + page_size]),
+            run_db_concurrently(RideFastSerializer.todays_events, page_ids),
+        )
+        
+        return {
+            'results': cls._with_durations(rows, todays_events=todays_events, shape=shape),
+            'count': total_count,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0
+        }
@@ -0,0 +1,36 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from ride.models import Ride
+from ride.rollups import RideStatusRollups
+from ride.distance_index import ride_distance_index
+from ride.fragment_cache import RideFragmentCache
+from todo_project.count_cache import CountCache
+
+
+@receiver(pre_save, sender=Ride)
+def ride_saving(sender, instance, **kwargs):
+    # Rides saved without being loaded first: read the state the rollups count them under.
+    if not instance._state.adding and not hasattr(instance, '_rollup_state'):
+        instance._rollup_state = Ride.objects.filter(id_ride=instance.id_ride).values_list(
+            'status', 'pickup_time'
+        ).first()
+
+
+@receiver(post_save, sender=Ride)
+def ride_saved(sender, instance, created, **kwargs):
+    ride_distance_index.mark_dirty(instance.id_ride)
+    CountCache.bump('ride')
+    RideFragmentCache.invalidate('ride', [instance.id_ride])
+    old_state = None if created else getattr(instance, '_rollup_state', None)
+    new_state = (instance.status, instance.pickup_time)
+    if old_state is None or RideStatusRollups.key(*old_state) != RideStatusRollups.key(*new_state):
+        RideStatusRollups.ride_changed(old_state, new_state)
+    instance._rollup_state = new_state
+
+
+@receiver(post_delete, sender=Ride)
+def ride_deleted(sender, instance, **kwargs):
+    ride_distance_index.mark_dirty(instance.id_ride)
+    CountCache.bump('ride')
+    RideFragmentCache.invalidate('ride', [instance.id_ride])
+    RideStatusRollups.ride_changed(getattr(instance, '_rollup_state', (instance.status, instance.pickup_time)), None)
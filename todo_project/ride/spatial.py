@@ -0,0 +1,93 @@
+from math import radians, cos, sin, pi
+from typing import Optional, Tuple
+from django.db import connections
+from django.db.models import F, FloatField, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cos, Power, Radians, Sin
+
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE_LAT = 111.32
+
+BBox = Tuple[float, float, float, float]
+
+
+class RideSpatialIndex:
+    """
+    Spatial filters on ride pickup/dropoff points.
+
+    On SQLite the candidates come from the `ride_spatial_index` R*Tree (kept in sync with
+    the `ride` table by triggers, see ride/migrations/0002_ride_spatial_index.py) and are
+    then checked exactly against the ride columns. Other backends use the range filters only.
+    """
+
+    TABLE = 'ride_spatial_index'
+    TARGETS = ('pickup', 'dropoff')
+
+    @staticmethod
+    def parse_bbox(value: str) -> Optional[BBox]:
+        """Parse `south,west,north,east` (min_lat,min_lon,max_lat,max_lon)."""
+        if not value:
+            return None
+        try:
+            south, west, north, east = (float(part) for part in value.split(','))
+        except (ValueError, TypeError):
+            return None
+        if south > north or west > east:
+            return None
+        return south, west, north, east
+
+    @staticmethod
+    def bbox_around(lat: float, lon: float, km: float) -> BBox:
+        lat_delta = km / KM_PER_DEGREE_LAT
+        cos_lat = cos(radians(lat))
+        if cos_lat < 1e-6:
+            lon_delta = 180.0
+        else:
+            lon_delta = min(180.0, km / (KM_PER_DEGREE_LAT * cos_lat))
+        return (
+            max(-90.0, lat - lat_delta),
+            max(-180.0, lon - lon_delta),
+            min(90.0, lat + lat_delta),
+            min(180.0, lon + lon_delta),
+        )
+
+    @classmethod
+    def filter_bbox(cls, queryset: QuerySet, bbox: BBox, target: str = 'pickup') -> QuerySet:
+        if target not in cls.TARGETS:
+            raise ValueError(f'Unknown spatial target: {target}')
+        south, west, north, east = bbox
+
+        if connections[queryset.db].vendor == 'sqlite':
+            # R*Tree stores 32-bit floats rounded outwards, so an overlap test never drops
+            # a matching point; the exact column range below removes the few false positives.
+            queryset = queryset.filter(id_ride__in=RawSQL(
+                f'SELECT id FROM {cls.TABLE} '
+                f'WHERE {target}_lat_max >= %s AND {target}_lat_min <= %s '
+                f'AND {target}_lon_max >= %s AND {target}_lon_min <= %s',
+                (south, north, west, east)
+            ))
+
+        return queryset.filter(**{
+            f'{target}_latitude__gte': south,
+            f'{target}_latitude__lte': north,
+            f'{target}_longitude__gte': west,
+            f'{target}_longitude__lte': east,
+        })
+
+    @classmethod
+    def filter_within_km(cls, queryset: QuerySet, lat: float, lon: float, km: float) -> QuerySet:
+        """Keep rides whose pickup point is within `km` great-circle kilometres of (lat, lon)."""
+        queryset = cls.filter_bbox(queryset, cls.bbox_around(lat, lon, km), target='pickup')
+
+        # Compare the haversine term directly against sin^2(d / 2R) instead of taking asin/sqrt in SQL.
+        lat1 = radians(lat)
+        lon1 = radians(lon)
+        threshold = sin(min(km / EARTH_RADIUS_KM, pi) / 2) ** 2
+        hav = (
+            Power(Sin((Radians(F('pickup_latitude')) - Value(lat1, output_field=FloatField())) / 2), 2)
+            + Value(cos(lat1), output_field=FloatField())
+            * Cos(Radians(F('pickup_latitude')))
+            * Power(Sin((Radians(F('pickup_longitude')) - Value(lon1, output_field=FloatField())) / 2), 2)
+        )
+        return queryset.alias(pickup_haversine=hav).filter(pickup_haversine__lte=threshold)
@@ -1,3 +1,570 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from io import StringIO
+from math import asin, cos, radians, sin, sqrt
+from unittest import mock
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connections, router
+from django.test import AsyncRequestFactory, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from ride.fast_serializer import RideFastSerializer
+from ride.async_views import ride_list, ride_with_duration
+from ride.distance_index import ride_distance_index
+from ride.fragment_cache import RideFragmentCache
+from ride.management.commands.benchmark import percentile
+from ride.models import Ride, RideStatusRollup
+from ride.serializers import RideSerializer
+from ride.services import RideService
+from ride.views import RideViewSet
+from ride_event.models import RideEvent, RideEventArchive
+from todo_project.count_cache import CountCache, check_shared_cache
+from todo_project.database import read_only, read_primary, read_replica
+from user.models import User
+from user.token_utils import TokenUtils
 
-# Create your tests here.
+
+class RideFastSerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        rider = User.objects.create(
+            email='rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='1234567890', password='hash', role='passenger'
+        )
+        driver = User.objects.create(
+            email='driver@example.com', first_name='Dan', last_name='Driver',
+            phone_number='', password='hash', role='driver'
+        )
+        now = timezone.now()
+        for i, status in enumerate(['en-route', 'pickup', 'completed']):
+            ride = Ride.objects.create(
+                status=status,
+                id_rider=rider,
+                id_driver=driver,
+                pickup_latitude=40.7128 + i,
+                pickup_longitude=-74.0060,
+                dropoff_latitude=40.7589,
+                dropoff_longitude=-73.9851 - i,
+                pickup_time=now - timedelta(days=i, microseconds=i * 137),
+            )
+            for j, hours_ago in enumerate([2, 30, 1]):
+                event = RideEvent.objects.create(id_ride=ride, description=f'Event {j}')
+                RideEvent.objects.filter(id_ride_event=event.id_ride_event).update(
+                    created_at=now - timedelta(hours=hours_ago)
+                )
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_matches_ride_serializer(self):
+        queryset = Ride.objects.order_by('id_ride')
+        expected = [RideSerializer(ride).data for ride in queryset]
+        self.assertEqual(self.render(RideFastSerializer.serialize_queryset(queryset)), self.render(expected))
+
+    def test_list_results_match_ride_serializer(self):
+        result = RideService.get_filtered_and_sorted_rides(page_size=10)
+        expected = [RideSerializer(ride).data for ride in RideService.get_base_queryset().order_by('-pickup_time')]
+        self.assertEqual(self.render(result['results']), self.render(expected))
+
+    def test_single_events_query_per_page(self):
+        rows = list(Ride.objects.values(*RideFastSerializer.values_fields()))
+        with self.assertNumQueries(1):
+            RideFastSerializer.serialize_rows(rows)
+
+    def test_sparse_shape_skips_joins_and_events(self):
+        shape = RideFastSerializer.shape(fields=['status', 'id_rider'])
+        with self.assertNumQueries(1):
+            result = RideService.get_filtered_and_sorted_rides(page_size=10, cursor='', shape=shape)
+        rider_id = User.objects.get(email='rider@example.com').id_user
+        self.assertEqual(result['results'][0], {'id_ride': result['results'][0]['id_ride'], 'id_rider': rider_id, 'status': 'en-route'})
+
+    def test_fragments_match_results_and_follow_event_writes(self):
+        caches[RideFragmentCache.CACHE_ALIAS].clear()
+        expected = RideService.get_filtered_and_sorted_rides(page_size=10)['results']
+        result = RideService.get_filtered_and_sorted_rides(page_size=10, as_fragments=True)
+        self.assertEqual(result['results'], [self.render(ride) for ride in expected])
+        # Fragments are served from the cache: only the page query (the count is cached too).
+        with self.assertNumQueries(1):
+            RideService.get_filtered_and_sorted_rides(page_size=10, as_fragments=True)
+
+        ride = Ride.objects.order_by('-pickup_time').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            RideEvent.objects.create(id_ride=ride, description='Event 3')
+        result = RideService.get_filtered_and_sorted_rides(page_size=10, as_fragments=True)
+        expected = RideService.get_filtered_and_sorted_rides(page_size=10)['results']
+        self.assertEqual(result['results'], [self.render(ride) for ride in expected])
+        self.assertEqual(len(expected[0]['todays_ride_events']), 3)
+
+    def test_page_and_cursor_modes_agree_on_order(self):
+        for order in ('asc', 'desc'):
+            pages = RideService.get_filtered_and_sorted_rides(order=order, page_size=3)
+            cursor = RideService.get_filtered_and_sorted_rides(order=order, page_size=3, cursor='')
+            ids = [ride['id_ride'] for ride in pages['results']]
+            self.assertEqual(ids, [ride['id_ride'] for ride in cursor['results']])
+            times = list(Ride.objects.filter(id_ride__in=ids).order_by('pickup_time').values_list('id_ride', flat=True))
+            self.assertEqual(ids, times if order == 'asc' else times[::-1])
+
+
+class SpatialFilterTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create(
+            email='rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='', password='hash', role='passenger'
+        )
+        # A 7x7 grid of pickups around (40, -74), 0.02 degrees apart; dropoffs mirror them.
+        self.rides = {
+            Ride.objects.create(
+                status='pickup', id_rider=user, id_driver=user,
+                pickup_latitude=40 + i * 0.02, pickup_longitude=-74 + j * 0.02,
+                dropoff_latitude=41 - i * 0.02, dropoff_longitude=-73 - j * 0.02, pickup_time=timezone.now(),
+            ).id_ride: (40 + i * 0.02, -74 + j * 0.02, 41 - i * 0.02, -73 - j * 0.02)
+            for i in range(-3, 4) for j in range(-3, 4)
+        }
+
+    def ids(self, **filters):
+        result = RideService.get_filtered_and_sorted_rides(page_size=100, **filters)
+        return {ride['id_ride'] for ride in result['results']}
+
+    def test_within_km_and_bboxes_match_the_exact_geometry(self):
+        def km(lat, lon):
+            lat1, lat2 = radians(40), radians(lat)
+            a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin(radians(lon + 74) / 2) ** 2
+            return 2 * 6371 * asin(sqrt(a))
+
+        self.assertEqual(
+            self.ids(lat=40.0, lon=-74.0, within_km=5),
+            {id_ride for id_ride, (lat, lon, _, _) in self.rides.items() if km(lat, lon) <= 5}
+        )
+        self.assertEqual(
+            self.ids(bbox=(39.99, -74.03, 40.05, -73.99)),
+            {id_ride for id_ride, (lat, lon, _, _) in self.rides.items() if 39.99 <= lat <= 40.05 and -74.03 <= lon <= -73.99}
+        )
+        self.assertEqual(
+            self.ids(dropoff_bbox=(40.99, -73.01, 41.03, -72.95)),
+            {id_ride for id_ride, (_, _, lat, lon) in self.rides.items() if 40.99 <= lat <= 41.03 and -73.01 <= lon <= -72.95}
+        )
+
+    def test_spatial_index_follows_ride_updates(self):
+        id_ride = next(iter(self.rides))
+        Ride.objects.filter(id_ride=id_ride).update(pickup_latitude=45.0, pickup_longitude=-70.0)
+        self.assertEqual(self.ids(bbox=(44.9, -70.1, 45.1, -69.9)), {id_ride})
+        Ride.objects.filter(id_ride=id_ride).delete()
+        self.assertEqual(self.ids(bbox=(44.9, -70.1, 45.1, -69.9)), set())
+
+
+class AsyncRideViewTests(TransactionTestCase):
+    # The async views read on worker threads with their own connections: the rows must be committed.
+
+    def setUp(self):
+        caches['default'].clear()
+        self.admin = User.objects.create(
+            email='admin@example.com', first_name='Ada', last_name='Admin',
+            phone_number='', password='hash', role='admin'
+        )
+        now = timezone.now()
+        for i, status in enumerate(['en-route', 'pickup', 'completed', 'completed', 'dropoff']):
+            ride = Ride.objects.create(
+                status=status, id_rider=self.admin, id_driver=self.admin,
+                pickup_latitude=40.7 + i * 0.01, pickup_longitude=-74.0,
+                dropoff_latitude=40.8, dropoff_longitude=-73.9, pickup_time=now - timedelta(hours=i),
+            )
+            RideEvent.objects.create(id_ride=ride, description=RideEvent.PICKUP_DESCRIPTION)
+            if status in ('completed', 'dropoff'):
+                RideEvent.objects.create(id_ride=ride, description=RideEvent.DROPOFF_DESCRIPTION)
+        self.token = TokenUtils.generate_token(self.admin)
+
+    async def async_get(self, view, params):
+        request = AsyncRequestFactory().get('/', params)
+        request.META['HTTP_COOKIE'] = self.token
+        response = await view(request)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def sync_get(self, path, params):
+        response = Client().get(path, params, HTTP_COOKIE=self.token)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def test_async_views_match_the_sync_endpoints(self):
+        cases = [
+            (ride_list, '/api/rides/', {}),
+            (ride_list, '/api/rides/', {'status': 'completed', 'sort': 'pickup_time', 'order': 'asc'}),
+            (ride_list, '/api/rides/', {'page': 2, 'page_size': 2, 'fields': 'id_ride,status'}),
+            (ride_with_duration, '/api/rides/with_duration/', {'sort': 'duration', 'order': 'asc'}),
+        ]
+        for view, path, params in cases:
+            expected = await sync_to_async(self.sync_get)(path, params)
+            self.assertTrue(expected['results'])
+            self.assertEqual(await self.async_get(view, params), expected, (path, params))
+
+
+class TripTimeTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create(
+            email='rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='', password='hash', role='passenger'
+        )
+        start = timezone.now() - timedelta(days=1)
+        self.durations = {}
+        # Trips of 5, 25, 15, 25 and 40 minutes; equal durations are ordered by id.
+        for minutes in (5, 25, 15, 25, 40):
+            ride = Ride.objects.create(
+                status='completed', id_rider=user, id_driver=user,
+                pickup_latitude=40.7128, pickup_longitude=-74.0060,
+                dropoff_latitude=40.7589, dropoff_longitude=-73.9851, pickup_time=start,
+            )
+            RideEvent.objects.create(id_ride=ride, description=RideEvent.PICKUP_DESCRIPTION, created_at=start)
+            RideEvent.objects.create(
+                id_ride=ride, description=RideEvent.DROPOFF_DESCRIPTION, created_at=start + timedelta(minutes=minutes)
+            )
+            self.durations[ride.id_ride] = minutes * 60
+
+    def stored_durations(self):
+        return dict(Ride.objects.values_list('id_ride', 'trip_duration_seconds'))
+
+    def test_event_writes_and_backfill_set_trip_times(self):
+        self.assertEqual(self.stored_durations(), self.durations)
+        Ride.objects.update(pickup_event_at=None, dropoff_event_at=None, trip_duration_seconds=None)
+        call_command('backfill_trip_times', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.stored_durations(), self.durations)
+
+    def test_duration_cursor_walks_every_ride_once_in_order(self):
+        expected = sorted(self.durations, key=lambda id_ride: (self.durations[id_ride], id_ride))
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            result = RideService.get_rides_with_duration(sort_by='duration', order='asc', cursor=cursor, page_size=2)
+            seen.extend(ride['id_ride'] for ride in result['results'])
+            cursor = result['next_cursor']
+        self.assertEqual(seen, expected)
+        self.assertEqual(
+            [ride['trip_duration_minutes'] for ride in RideService.get_rides_with_duration(sort_by='duration')['results']],
+            [40, 25, 25, 15, 5]
+        )
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['responses'].clear()
+        self.admin = User.objects.create(
+            email='admin@example.com', first_name='Ada', last_name='Admin',
+            phone_number='', password='hash', role='admin'
+        )
+        self.ride = Ride.objects.create(
+            status='pickup', id_rider=self.admin, id_driver=self.admin,
+            pickup_latitude=40.7128, pickup_longitude=-74.0060,
+            dropoff_latitude=40.7589, dropoff_longitude=-73.9851, pickup_time=timezone.now(),
+        )
+        self.client = Client(HTTP_COOKIE=TokenUtils.generate_token(self.admin))
+
+    def test_etag_revalidation_and_invalidation(self):
+        for path in ('/api/rides/?status=pickup', f'/api/rides/{self.ride.id_ride}/'):
+            first = self.client.get(path)
+            self.assertEqual(first.status_code, 200)
+            etag = first['ETag']
+            # Served from the cache: no query at all, and the same body and ETag.
+            with self.assertNumQueries(0):
+                again = self.client.get(path)
+            self.assertEqual((again.content, again['ETag']), (first.content, etag))
+            not_modified = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual((not_modified.status_code, not_modified.content), (304, b''))
+
+        etag = self.client.get(f'/api/rides/{self.ride.id_ride}/')['ETag']
+        self.ride.status = 'dropoff'
+        self.ride.save()
+        changed = self.client.get(f'/api/rides/{self.ride.id_ride}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertEqual(changed.json()['status'], 'dropoff')
+
+
+class DistanceSortTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create(
+            email='rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='', password='hash', role='passenger'
+        )
+        now = timezone.now()
+        # Ride i is i * ~1.1 km north of (40, -74), so distance order is creation order.
+        self.rides = [
+            Ride.objects.create(
+                status='pickup' if i % 2 else 'en-route', id_rider=user, id_driver=user,
+                pickup_latitude=40 + i * 0.01, pickup_longitude=-74.0,
+                dropoff_latitude=40.5, dropoff_longitude=-74.0, pickup_time=now,
+            )
+            for i in range(30)
+        ]
+        ride_distance_index.invalidate()
+
+    def page(self, page, status=None, order='asc'):
+        result = RideService.get_filtered_and_sorted_rides(
+            status=status, sort_by='distance', order=order, lat=40.0, lon=-74.0, page=page, page_size=4
+        )
+        return result['count'], [ride['id_ride'] for ride in result['results']]
+
+    def expected(self, status, descending=False):
+        ids = [ride.id_ride for ride in self.rides]
+        matching = set(Ride.objects.filter(status=status).values_list('id_ride', flat=True))
+        return [id_ride for id_ride in (ids[::-1] if descending else ids) if id_ride in matching]
+
+    def test_pages_follow_status_changes_the_index_has_not_seen(self):
+        self.page(1, status='pickup')
+        # Written by another worker: no signal reaches this process's index.
+        Ride.objects.filter(id_ride__in=[ride.id_ride for ride in self.rides[:6:2]]).update(status='pickup')
+        Ride.objects.filter(id_ride__in=[ride.id_ride for ride in self.rides[1:8:3]]).update(status='completed')
+        for descending in (False, True):
+            expected = self.expected('pickup', descending)
+            pages = [self.page(page, 'pickup', 'desc' if descending else 'asc') for page in (1, 2, 4)]
+            self.assertEqual([count for count, _ in pages], [len(expected)] * 3)
+            self.assertEqual([ids for _, ids in pages], [expected[0:4], expected[4:8], expected[12:16]])
+
+    def test_status_filter_ranks_only_matching_rides(self):
+        completed = {ride.id_ride for ride in self.rides[:3]}
+        Ride.objects.filter(id_ride__in=completed).update(status='completed')
+        with mock.patch.object(ride_distance_index, 'nearest', wraps=ride_distance_index.nearest) as nearest:
+            self.assertEqual(self.page(1, status='completed'), (3, sorted(completed)))
+        self.assertEqual(nearest.call_count, 1)
+        self.assertEqual(nearest.call_args.kwargs['ride_ids'], completed)
+
+
+class CountCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create(
+            email='rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='', password='hash', role='passenger'
+        )
+
+    def create_ride(self, status='pickup'):
+        return Ride.objects.create(
+            status=status, id_rider=self.user, id_driver=self.user,
+            pickup_latitude=40.7128, pickup_longitude=-74.0060,
+            dropoff_latitude=40.7589, dropoff_longitude=-73.9851, pickup_time=timezone.now(),
+        )
+
+    def count(self, status):
+        return CountCache.count('rides', Ride.objects.filter(status=status), filters={'status': status}, depends_on=('ride',))
+
+    def test_ride_writes_invalidate_cached_counts(self):
+        ride = self.create_ride()
+        self.assertEqual(self.count('pickup'), 1)
+        self.create_ride()
+        self.assertEqual(self.count('pickup'), 2)
+        ride.status = 'completed'
+        ride.save()
+        self.assertEqual((self.count('pickup'), self.count('completed')), (1, 1))
+        ride.delete()
+        self.assertEqual(self.count('completed'), 0)
+
+    def test_bulk_updates_are_seen_after_a_bump(self):
+        self.create_ride()
+        self.assertEqual(self.count('completed'), 0)
+        Ride.objects.update(status='completed')
+        self.assertEqual(self.count('completed'), 0)
+        CountCache.bump('ride')
+        self.assertEqual(self.count('completed'), 1)
+
+    def test_estimated_count_is_exact_without_statistics_and_cached(self):
+        rides = [self.create_ride() for _ in range(3)]
+        rides[0].delete()
+        with self.assertNumQueries(2):
+            # sqlite_stat1 is looked up (no ANALYZE yet: no table), then the exact count runs.
+            self.assertEqual(CountCache.count('rides', Ride.objects.all(), depends_on=('ride',), estimate=True), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(CountCache.count('rides', Ride.objects.all(), depends_on=('ride',), estimate=True), 2)
+
+    def test_process_local_cache_is_flagged_by_the_deploy_check(self):
+        self.assertEqual([message.id for message in check_shared_cache(None)], ['todo_project.W001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class RideExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            email='admin@example.com', first_name='Ada', last_name='Admin',
+            phone_number='', password='hash', role='admin'
+        )
+        for i in range(5):
+            ride = Ride.objects.create(
+                status='completed', id_rider=cls.admin, id_driver=cls.admin,
+                pickup_latitude=40.7128, pickup_longitude=-74.0060,
+                dropoff_latitude=40.7589, dropoff_longitude=-73.9851,
+                pickup_time=timezone.now() - timedelta(hours=i),
+            )
+            RideEvent.objects.create(id_ride=ride, description=f'Event {i}')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.token = TokenUtils.generate_token(self.admin)
+
+    def wsgi_export(self):
+        response = Client().get('/api/rides/export/', HTTP_COOKIE=self.token)
+        return b''.join(response.streaming_content)
+
+    def test_queries_of_the_streamed_body_are_reported(self):
+        response = Client().get('/api/rides/export/', HTTP_COOKIE=self.token)
+        self.assertIn('queries before the body', response['Server-Timing'])
+        with self.assertLogs('todo_project.sql', level='INFO') as logs:
+            b''.join(response.streaming_content)
+        report = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(report['event'], 'streamed_response')
+        # The rides and their events are read while the body is produced.
+        self.assertGreaterEqual(report['query_count'], 2)
+
+    async def test_asgi_export_streams_the_same_body(self):
+        expected = await sync_to_async(self.wsgi_export)()
+        self.assertEqual(len(expected.splitlines()), 5)
+        request = AsyncRequestFactory().get('/api/rides/export/')
+        # Set directly: the factory's own (empty) cookie header would be joined in front of the token.
+        request.META['HTTP_COOKIE'] = self.token
+        response = await sync_to_async(RideViewSet.as_view({'get': 'export'}))(request)
+        self.assertEqual(response.status_code, 200)
+        # An async iterator: Django would otherwise read a sync one into a list first.
+        self.assertTrue(response.is_async)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), expected)
+
+
+class RideStatsTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.admin = User.objects.create(
+            email='admin@example.com', first_name='Ada', last_name='Admin',
+            phone_number='', password='hash', role='admin'
+        )
+        self.now = datetime(2026, 10, 18, 10, 15, tzinfo=dt_timezone.utc)
+        for pickup_time in (self.now.replace(hour=0, minute=30), self.now.replace(hour=9), self.now - timedelta(hours=10, minutes=45)):
+            Ride.objects.create(
+                status='completed', id_rider=self.admin, id_driver=self.admin,
+                pickup_latitude=40.7128, pickup_longitude=-74.0060,
+                dropoff_latitude=40.7589, dropoff_longitude=-73.9851, pickup_time=pickup_time,
+            )
+
+    def stats(self, **params):
+        with mock.patch('ride.views.timezone.now', return_value=self.now):
+            response = Client().get('/api/rides/stats/', params, HTTP_COOKIE=TokenUtils.generate_token(self.admin))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_day_buckets_default_to_the_current_utc_day(self):
+        body = self.stats(bucket='day')
+        self.assertEqual((body['from'], body['to']), ('2026-10-18T00:00:00+00:00', '2026-10-19T00:00:00+00:00'))
+        self.assertEqual(body['results'], [{'day': '2026-10-18T00:00:00+00:00', 'status': 'completed', 'count': 2}])
+
+    def test_hour_buckets_default_to_the_last_24_hours(self):
+        body = self.stats()
+        self.assertEqual(body['from'], '2026-10-17T11:00:00+00:00')
+        self.assertEqual(body['totals']['completed'], 3)
+
+
+class PickupWindowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(
+            email='rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='', password='hash', role='passenger'
+        )
+        cls.start = timezone.now().replace(microsecond=0) - timedelta(days=1)
+        cls.ids = [
+            Ride.objects.create(
+                status='completed', id_rider=user, id_driver=user,
+                pickup_latitude=40.7128, pickup_longitude=-74.0060,
+                dropoff_latitude=40.7589, dropoff_longitude=-73.9851, pickup_time=cls.start + timedelta(hours=hour),
+            ).id_ride
+            for hour in range(5)
+        ]
+
+    def ride_ids(self, **kwargs):
+        result = RideService.get_filtered_and_sorted_rides(**kwargs)
+        return [ride['id_ride'] for ride in result['results']], result['count']
+
+    def test_sort_datetime_seeks_and_from_to_bound_the_window(self):
+        anchor = (self.start + timedelta(hours=2)).isoformat()
+        self.assertEqual(self.ride_ids(sort_by=anchor), (self.ids[2::-1], 3))
+        self.assertEqual(self.ride_ids(sort_by=anchor, order='asc'), (self.ids[2:], 3))
+        self.assertEqual(
+            self.ride_ids(pickup_from=self.start + timedelta(hours=1), pickup_to=self.start + timedelta(hours=3)),
+            (self.ids[2:0:-1], 2)
+        )
+
+    def test_explain_queries_shows_the_seek_uses_an_index(self):
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        plan = out.getvalue().split('== rides: seek to sort datetime')[1].split('== ')[0]
+        self.assertIn('SEARCH ride USING INDEX ride_pickup_time_idx (pickup_time<?)', plan)
+        self.assertNotIn('full table scan', plan)
+
+
+class ReadRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch('todo_project.database.read_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_reads_marked_read_only_go_to_the_read_alias(self):
+        @read_only
+        def service_read():
+            return router.db_for_read(Ride)
+
+        @read_only
+        def streamed_read():
+            yield router.db_for_read(Ride)
+
+        self.assertEqual(router.db_for_read(Ride), 'default')
+        self.assertEqual((service_read(), list(streamed_read())), ('replica', ['replica']))
+        with read_replica():
+            self.assertEqual(router.db_for_read(Ride), 'replica')
+            self.assertEqual(router.db_for_write(Ride), 'default')
+            with read_primary():
+                self.assertEqual(router.db_for_read(Ride), 'default')
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(router.db_for_read(Ride), 'default')
+
+
+class PercentileTests(SimpleTestCase):
+
+    def test_nearest_rank(self):
+        self.assertEqual(percentile(list(range(1, 21)), 0.95), 19)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
+        self.assertEqual(percentile(list(range(1, 101)), 0.07), 7)
+        self.assertEqual(percentile(list(range(1, 11)), 0.50), 5)
+        self.assertEqual(percentile(list(range(1, 12)), 0.50), 6)
+        self.assertEqual(percentile([4.2], 0.99), 4.2)
+        self.assertIsNone(percentile([], 0.5))
+
+
+class SeedDataTests(TestCase):
+
+    def test_seeds_rides_with_events_and_trip_times(self):
+        call_command('seed_data', rides=25, seed=7, batch_size=10, stdout=StringIO())
+        self.assertEqual(Ride.objects.count(), 25)
+        # Events keep their backdated timestamps rather than the time of the insert.
+        self.assertTrue(RideEvent.objects.filter(created_at__lt=timezone.now() - timedelta(hours=1)).exists())
+        finished = Ride.objects.filter(status__in=['dropoff', 'completed'])
+        self.assertTrue(finished.exists())
+        self.assertFalse(finished.filter(trip_duration_seconds__isnull=True).exists())
+
+    def test_clear_replaces_rides_and_rollups(self):
+        call_command('seed_data', rides=25, seed=7, stdout=StringIO())
+        ride = Ride.objects.first()
+        RideEventArchive.objects.create(id_ride=ride, description='Old event', created_at=ride.pickup_time, archived_at=ride.pickup_time)
+        call_command('seed_data', rides=5, seed=8, clear=True, stdout=StringIO())
+        self.assertEqual(Ride.objects.count(), 5)
+        self.assertFalse(RideEventArchive.objects.exists())
+        self.assertFalse(RideEvent.objects.exclude(id_ride__in=Ride.objects.values('id_ride')).exists())
+        self.assertEqual(sum(RideStatusRollup.objects.values_list('count', flat=True)), 5)
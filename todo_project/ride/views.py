@@ -1,11 +1,173 @@
+import csv
+import json
+from datetime import timedelta
+from django.core.handlers.asgi import ASGIRequest
+from django.utils import timezone
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from ride.models import Ride
 from ride.serializers import RideSerializer
 from ride.services import RideService
+from ride.fast_serializer import InvalidFieldset, RideFastSerializer
+from ride.fragment_cache import RideFragmentCache
+from ride.rollups import RideStatusRollups
+from ride.spatial import RideSpatialIndex
 from user.authentication import CookieOnlyAdminAuthentication
 from user.permissions import IsAdminRole
+from todo_project.async_utils import iterate_in_thread
+from todo_project.pagination import InvalidCursor, paginated_response_body
+from todo_project.response_cache import ResponseCache
+
+
+class InvalidDatetime(ValueError):
+    """A `from`/`to` query parameter that is not an ISO 8601 date or datetime."""
+
+
+def parse_pickup_window(query_params) -> dict:
+    """`from`/`to` query parameters as pickup_from/pickup_to kwargs; raises InvalidDatetime."""
+    window = {}
+    for param, key in (('from', 'pickup_from'), ('to', 'pickup_to')):
+        value = query_params.get(param)
+        if value:
+            window[key] = RideService._parse_datetime_string(value)
+            if window[key] is None:
+                raise InvalidDatetime(f"Invalid '{param}' datetime '{value}'.")
+    return window
+
+
+def parse_shape(query_params):
+    """`fields`/`expand` query parameters (comma-separated) as a RideShape; raises InvalidFieldset."""
+    def names(param):
+        value = query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+    
+    return RideFastSerializer.shape(fields=names('fields'), expand=names('expand'))
+
+
+def parse_list_params(query_params) -> dict:
+    """Translate the rides list query string into RideService.get_filtered_and_sorted_rides kwargs."""
+    lat = query_params.get('lat', None)
+    lon = query_params.get('lon', None)
+    within_km = query_params.get('within_km', None)
+    
+    try:
+        page = int(query_params.get('page', 1))
+        page_size = int(query_params.get('page_size', 10))
+    except (ValueError, TypeError):
+        page = 1
+        page_size = 10
+    
+    try:
+        lat = float(lat) if lat else None
+        lon = float(lon) if lon else None
+    except (ValueError, TypeError):
+        lat = None
+        lon = None
+    
+    try:
+        within_km = float(within_km) if within_km else None
+    except (ValueError, TypeError):
+        within_km = None
+    
+    return {
+        'status': query_params.get('status', None),
+        'email': query_params.get('email', None),
+        'sort_by': query_params.get('sort', None),
+        'order': query_params.get('order', 'desc'),  # Default to descending
+        'lat': lat,
+        'lon': lon,
+        'page': page,
+        'page_size': page_size,
+        'within_km': within_km,
+        'bbox': RideSpatialIndex.parse_bbox(query_params.get('bbox', None)),
+        'dropoff_bbox': RideSpatialIndex.parse_bbox(query_params.get('dropoff_bbox', None)),
+        'cursor': query_params.get('cursor', None),
+        'estimate_count': query_params.get('count') == 'estimated',
+        'shape': parse_shape(query_params),
+        **parse_pickup_window(query_params),
+    }
+
+
+def parse_duration_params(query_params) -> dict:
+    """Translate the with_duration query string into RideService.get_rides_with_duration kwargs."""
+    try:
+        page = int(query_params.get('page', 1))
+        page_size = int(query_params.get('page_size', 10))
+    except (ValueError, TypeError):
+        page = 1
+        page_size = 10
+    
+    try:
+        min_duration = int(query_params.get('min_duration')) if query_params.get('min_duration') else None
+        max_duration = int(query_params.get('max_duration')) if query_params.get('max_duration') else None
+    except (ValueError, TypeError):
+        min_duration = None
+        max_duration = None
+    
+    return {
+        'page': page,
+        'page_size': page_size,
+        'cursor': query_params.get('cursor', None),
+        'estimate_count': query_params.get('count') == 'estimated',
+        'sort_by': query_params.get('sort', None),
+        'order': query_params.get('order', 'desc'),
+        'min_duration': min_duration,
+        'max_duration': max_duration,
+        'shape': parse_shape(query_params),
+    }
+
+
+def ndjson_lines(chunks):
+    encoder = JSONEncoder(separators=(',', ':'))
+    for rides in chunks:
+        yield ''.join(encoder.encode(ride) + '\n' for ride in rides)
+
+
+class _EchoBuffer:
+    """File-like object whose write() returns the line, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _flatten(ride):
+    row = {}
+    for key, value in ride.items():
+        if isinstance(value, dict):
+            for nested_key, nested_value in value.items():
+                row[f'{key}.{nested_key}'] = nested_value
+        elif isinstance(value, list):
+            row[key] = json.dumps(value, cls=JSONEncoder, separators=(',', ':'))
+        else:
+            row[key] = value
+    return row
+
+
+def csv_lines(chunks):
+    """One CSV row per ride; nested users become `id_rider.email`-style columns, events a JSON column."""
+    writer = csv.writer(_EchoBuffer())
+    header = None
+    for rides in chunks:
+        lines = []
+        for ride in rides:
+            row = _flatten(ride)
+            if header is None:
+                header = list(row)
+                lines.append(writer.writerow(header))
+            lines.append(writer.writerow([row.get(column) for column in header]))
+        yield ''.join(lines)
+
+
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
 
 
 class RideViewSet(viewsets.ModelViewSet):
@@ -16,72 +178,125 @@ class RideViewSet(viewsets.ModelViewSet):
     lookup_field = 'id_ride'
     
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        return Response(instance.serialized)
+        return ResponseCache.respond(request, 'ride-detail', lambda: self._retrieve(request, kwargs[self.lookup_field]))
     
-    def list(self, request, *args, **kwargs):
-        
-        status = request.query_params.get('status', None)
-        email = request.query_params.get('email', None)
-        sort_by = request.query_params.get('sort', None)
-        order = request.query_params.get('order', 'desc')  # Default to descending
-        lat = request.query_params.get('lat', None)
-        lon = request.query_params.get('lon', None)
+    def _retrieve(self, request, id_ride):
+        try:
+            shape = parse_shape(request.query_params)
+        except InvalidFieldset as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
+        rides = RideFastSerializer.serialize_queryset(Ride.objects.filter(id_ride=id_ride), shape=shape)
+        if not rides:
+            raise NotFound()
+        return Response(rides[0])
+    
+    def list(self, request, *args, **kwargs):
+        return ResponseCache.respond(request, 'ride-list', lambda: self._list(request))
+    
+    def _list(self, request):
+        # Stitch JSON responses from cached per-ride fragments; other renderers need the dicts.
+        as_fragments = RideFragmentCache.enabled() and request.accepted_renderer.format == 'json'
         try:
-            page = int(request.query_params.get('page', 1))
-            page_size = int(request.query_params.get('page_size', 10))
-        except (ValueError, TypeError):
-            page = 1
-            page_size = 10
+            result = RideService.get_filtered_and_sorted_rides(
+                **parse_list_params(request.query_params), as_fragments=as_fragments
+            )
+        except (InvalidCursor, InvalidDatetime, InvalidFieldset) as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        body = paginated_response_body(request.query_params, result, result['results'])
+        if as_fragments:
+            return RideFragmentCache.response(body)
+        return Response(body)
+    
+    @action(detail=False, methods=['GET'], permission_classes=[IsAdminRole])
+    def export(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({
+                'status': 'error',
+                'message': f"Invalid output '{output}'. Use one of: {', '.join(EXPORT_FORMATS)}."
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            lat = float(lat) if lat else None
-            lon = float(lon) if lon else None
-        except (ValueError, TypeError):
-            lat = None
-            lon = None
+            window = parse_pickup_window(request.query_params)
+        except InvalidDatetime as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        result = RideService.get_filtered_and_sorted_rides(
-            status=status,
-            email=email,
-            sort_by=sort_by,
-            order=order,
-            lat=lat,
-            lon=lon,
-            page=page,
-            page_size=page_size
+        writer, content_type = EXPORT_FORMATS[output]
+        chunks = RideService.export_rides(
+            status=request.query_params.get('status', None),
+            email=request.query_params.get('email', None),
+            sort_by=request.query_params.get('sort', None),
+            order=request.query_params.get('order', 'desc'),
+            **window
         )
+        body = writer(chunks)
+        if isinstance(request._request, ASGIRequest):
+            # Under ASGI a sync iterator would be read into memory whole before the first byte is sent.
+            body = iterate_in_thread(body)
+        response = StreamingHttpResponse(body, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="rides.{output}"'
+        return response
+    
+    @action(detail=False, methods=['GET'], permission_classes=[IsAdminRole])
+    def stats(self, request):
+        bucket = request.query_params.get('bucket', 'hour')
+        if bucket not in ('hour', 'day'):
+            return Response({
+                'status': 'error',
+                'message': "Invalid bucket. Use 'hour' or 'day'."
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        data = [ride.serialized for ride in result['results']]
+        ride_status = request.query_params.get('status', None)
+        if ride_status and ride_status not in dict(Ride.STATUS_CHOICES):
+            return Response({
+                'status': 'error',
+                'message': f"Invalid status '{ride_status}'."
+            }, status=status.HTTP_400_BAD_REQUEST)
         
+        try:
+            window = parse_pickup_window(request.query_params)
+        except InvalidDatetime as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Default window: the last 24 hours, current hour included, or with `bucket=day` the current
+        # UTC day, so that no bucket covers only part of its day.
+        if bucket == 'day':
+            end = window.get('pickup_to') or RideStatusRollups.day_bucket(timezone.now()) + timedelta(days=1)
+            start = window.get('pickup_from') or end - timedelta(days=1)
+        else:
+            end = window.get('pickup_to') or RideStatusRollups.hour_bucket(timezone.now()) + timedelta(hours=1)
+            start = window.get('pickup_from') or end - timedelta(hours=24)
+        
+        result = RideStatusRollups.stats(start, end, status=ride_status, bucket=bucket)
         return Response({
-            'count': result['count'],
-            'page': result['page'],
-            'page_size': result['page_size'],
-            'total_pages': result['total_pages'],
-            'next': f"?page={page + 1}&page_size={page_size}" if page < result['total_pages'] else None,
-            'previous': f"?page={page - 1}&page_size={page_size}" if page > 1 else None,
-            'results': data
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'bucket': bucket,
+            **result
         })
     
     @action(detail=False, methods=['GET'], permission_classes=[IsAdminRole])
     def with_duration(self, request):
         try:
-            page = int(request.query_params.get('page', 1))
-            page_size = int(request.query_params.get('page_size', 10))
-        except (ValueError, TypeError):
-            page = 1
-            page_size = 10
+            result = RideService.get_rides_with_duration(**parse_duration_params(request.query_params))
+        except (InvalidCursor, InvalidFieldset) as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        result = RideService.get_rides_with_duration(page=page, page_size=page_size)
-        
-        return Response({
-            'count': result['count'],
-            'page': result['page'],
-            'page_size': result['page_size'],
-            'total_pages': result['total_pages'],
-            'next': f"?page={page + 1}&page_size={page_size}" if page < result['total_pages'] else None,
-            'previous': f"?page={page - 1}&page_size={page_size}" if page > 1 else None,
-            'results': result['results']
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(paginated_response_body(request.query_params, result, result['results']), status=status.HTTP_200_OK)
\ No newline at end of file
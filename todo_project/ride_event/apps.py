@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RideEventConfig(AppConfig):
     name = 'ride_event'
+
+    def ready(self):
+        import ride_event.signals  # noqa: F401
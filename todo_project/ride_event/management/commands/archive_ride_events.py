@@ -0,0 +1,78 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from ride_event.models import RideEvent, RideEventArchive
+from todo_project.count_cache import CountCache
+
+
+class Command(BaseCommand):
+    help = 'Move RideEvents older than the retention age from ride_event to ride_event_archive in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=getattr(settings, 'RIDE_EVENT_RETENTION_DAYS', 30),
+            help='Archive events created more than this many days ago (default: RIDE_EVENT_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of events moved per transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many events would be archived',
+        )
+
+    def handle(self, *args, **options):
+        # The API shows the last 24 hours of events, which must stay in the hot table.
+        if options['older_than_days'] < 1:
+            raise CommandError('--older-than-days must be at least 1.')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive.')
+
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        old_events = RideEvent.objects.filter(created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{old_events.count()} events created before {cutoff.isoformat()} would be archived.')
+            return
+
+        qn = connection.ops.quote_name
+        columns = ', '.join(qn(name) for name in ('id_ride_event', 'id_ride', 'description', 'created_at'))
+        source = qn(RideEvent._meta.db_table)
+        target = qn(RideEventArchive._meta.db_table)
+        # Old events have the lowest ids, so each batch is "id <= last id of the batch AND old".
+        predicate = f'{qn("id_ride_event")} <= %s AND {qn("created_at")} < %s'
+        created_at_field = RideEvent._meta.get_field('created_at')
+        cutoff_param = created_at_field.get_db_prep_value(cutoff, connection)
+        archived_at_param = created_at_field.get_db_prep_value(timezone.now(), connection)
+
+        self.stdout.write(self.style.SUCCESS(f'Archiving events created before {cutoff.isoformat()}...'))
+        archived = 0
+        while True:
+            ids = list(old_events.order_by('id_ride_event').values_list('id_ride_event', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {target} ({columns}, {qn("archived_at")}) '
+                    f'SELECT {columns}, %s FROM {source} WHERE {predicate}',
+                    [archived_at_param, ids[-1], cutoff_param]
+                )
+                # Raw DELETE: the post_delete signals would recompute trip times row by row for
+                # events that are only moving tables.
+                cursor.execute(f'DELETE FROM {source} WHERE {predicate}', [ids[-1], cutoff_param])
+                archived += cursor.rowcount
+
+            self.stdout.write(f'Archived events up to #{ids[-1]}')
+
+        if archived:
+            CountCache.bump('ride_event')
+        self.stdout.write(self.style.SUCCESS(f'Archive completed: {archived} events moved to ride_event_archive.'))
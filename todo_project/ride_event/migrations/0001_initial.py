@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-02-22 05:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('ride', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RideEvent',
+            fields=[
+                ('id_ride_event', models.AutoField(db_column='id_ride_event', primary_key=True, serialize=False)),
+                ('description', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('id_ride', models.ForeignKey(db_column='id_ride', on_delete=django.db.models.deletion.CASCADE, to='ride.ride')),
+            ],
+            options={
+                'verbose_name': 'Ride Event',
+                'verbose_name_plural': 'Ride Events',
+                'db_table': 'ride_event',
+            },
+        ),
+    ]
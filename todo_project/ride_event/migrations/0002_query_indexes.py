@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ride', '0004_query_indexes'),
+        ('ride_event', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rideevent',
+            index=models.Index(fields=['id_ride', 'created_at'], name='ride_event_ride_created_idx'),
+        ),
+    ]
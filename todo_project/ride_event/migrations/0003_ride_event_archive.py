@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ride', '0004_query_indexes'),
+        ('ride_event', '0002_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RideEventArchive',
+            fields=[
+                ('id_ride_event', models.IntegerField(db_column='id_ride_event', primary_key=True, serialize=False)),
+                ('description', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('id_ride', models.ForeignKey(db_column='id_ride', on_delete=django.db.models.deletion.CASCADE, related_name='archived_events', to='ride.ride')),
+            ],
+            options={
+                'verbose_name': 'Archived Ride Event',
+                'verbose_name_plural': 'Archived Ride Events',
+                'db_table': 'ride_event_archive',
+                'indexes': [models.Index(fields=['id_ride', 'created_at'], name='ride_event_arch_ride_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ride_event', '0003_ride_event_archive'),
+    ]
+
+    operations = [
+        # The column is unchanged; only Django's default moves. SQLite would otherwise rebuild
+        # the whole ride_event table.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='rideevent',
+                    name='created_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
@@ -1,18 +1,58 @@
 from django.db import models
+from django.utils import timezone
 from ride.models import Ride
 
 
 class RideEvent(models.Model):
     
+    PICKUP_DESCRIPTION = 'Status changed to pickup'
+    DROPOFF_DESCRIPTION = 'Status changed to dropoff'
+    
     id_ride_event = models.AutoField(primary_key=True, db_column='id_ride_event')
     id_ride = models.ForeignKey(Ride, on_delete=models.CASCADE, db_column='id_ride')
     description = models.CharField(max_length=255)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Stamped when the instance is built, not when it is inserted: events buffered by the
+    # write-behind writer keep the time they were accepted.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'ride_event'
         verbose_name = 'Ride Event'
         verbose_name_plural = 'Ride Events'
+        indexes = [
+            # Rolling 24h events of a page of rides: id_ride IN (...) AND created_at >= ...
+            models.Index(fields=['id_ride', 'created_at'], name='ride_event_ride_created_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_description = dict(zip(field_names, values)).get('description')
+        return instance
+    
+    def __str__(self):
+        return f"Ride Event #{self.id_ride_event} - {self.description[:50]}"
+
+class RideEventArchive(models.Model):
+    """
+    RideEvents moved out of the hot `ride_event` table by the `archive_ride_events` command.
+
+    Rows keep their original id and created_at. Trip-time recomputation and exports read both tables.
+    """
+    
+    id_ride_event = models.IntegerField(primary_key=True, db_column='id_ride_event')
+    id_ride = models.ForeignKey(Ride, on_delete=models.CASCADE, db_column='id_ride', related_name='archived_events')
+    description = models.CharField(max_length=255)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'ride_event_archive'
+        verbose_name = 'Archived Ride Event'
+        verbose_name_plural = 'Archived Ride Events'
+        indexes = [
+            models.Index(fields=['id_ride', 'created_at'], name='ride_event_arch_ride_idx'),
+        ]
     
     def __str__(self):
-        return f"Ride Event #{self.id_ride_event} - {self.description[:50]}"
\ No newline at end of file
+        return f"Archived Ride Event #{self.id_ride_event} - {self.description[:50]}"
@@ -0,0 +1,92 @@
+from typing import List, Tuple
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+from ride.fragment_cache import RideFragmentCache
+from ride.models import Ride
+from ride.services import RideService
+from ride_event.models import RideEvent
+from ride_event.serializers import RideEventSerializer
+from ride_event.write_behind import ride_event_write_behind
+from todo_project.count_cache import CountCache
+
+
+class RideEventBatchItemSerializer(serializers.Serializer):
+    """Shape check of one batch item; ride existence is checked for the whole batch at once."""
+    id_ride = serializers.IntegerField(min_value=1)
+    description = serializers.CharField(max_length=255)
+
+
+class RideEventService:
+
+    @staticmethod
+    def max_batch_size() -> int:
+        return getattr(settings, 'RIDE_EVENT_BATCH_MAX_SIZE', 1000)
+
+    @staticmethod
+    def after_bulk_write(events: List[RideEvent]):
+        """What the post_save signals do for single saves, applied once for a bulk write."""
+        trip_descriptions = (RideEvent.PICKUP_DESCRIPTION, RideEvent.DROPOFF_DESCRIPTION)
+        affected_rides = {event.id_ride_id for event in events if event.description in trip_descriptions}
+        if affected_rides:
+            RideService.refresh_trip_times(affected_rides)
+            CountCache.bump('ride')
+        CountCache.bump('ride_event')
+        RideFragmentCache.invalidate('ride', {event.id_ride_id for event in events})
+
+    @classmethod
+    def write_events(cls, events: List[RideEvent]):
+        with transaction.atomic():
+            RideEvent.objects.bulk_create(events)
+            cls.after_bulk_write(events)
+
+    @classmethod
+    def create_events(cls, items: list) -> Tuple[List[dict], int]:
+        """
+        Validate and insert a batch of events for any number of rides.
+
+        Returns (per-item results in input order, number of events created or accepted). Valid
+        items are inserted with one bulk_create in a single transaction, or handed to the
+        write-behind buffer when it is enabled (their result status is then `accepted`); invalid
+        items are reported with their errors and do not prevent the others from being created.
+        Raises BufferFull when the write-behind buffer has no room for the batch.
+        """
+        results = [None] * len(items)
+        valid = []
+        item_serializer = RideEventBatchItemSerializer()
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, item_serializer.run_validation(item)))
+            except serializers.ValidationError as e:
+                results[index] = {'index': index, 'status': 'error', 'errors': e.detail}
+
+        ride_ids = {data['id_ride'] for _, data in valid}
+        existing = set(Ride.objects.filter(id_ride__in=ride_ids).values_list('id_ride', flat=True)) if ride_ids else set()
+
+        to_create = []
+        for index, data in valid:
+            if data['id_ride'] not in existing:
+                results[index] = {
+                    'index': index,
+                    'status': 'error',
+                    'errors': {'id_ride': [f"Ride {data['id_ride']} does not exist."]}
+                }
+                continue
+            to_create.append((index, RideEvent(id_ride_id=data['id_ride'], description=data['description'])))
+
+        if to_create:
+            events = [event for _, event in to_create]
+            if ride_event_write_behind.enabled:
+                ride_event_write_behind.submit(events)
+                for index, event in to_create:
+                    results[index] = {
+                        'index': index,
+                        'status': 'accepted',
+                        'data': {'id_ride': event.id_ride_id, 'description': event.description}
+                    }
+            else:
+                cls.write_events(events)
+                for (index, _), data in zip(to_create, RideEventSerializer(events, many=True).data):
+                    results[index] = {'index': index, 'status': 'created', 'data': data}
+
+        return results, len(to_create)
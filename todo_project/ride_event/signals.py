@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from ride.fragment_cache import RideFragmentCache
+from ride.services import RideService
+from ride_event.models import RideEvent
+from todo_project.count_cache import CountCache
+
+
+TRIP_DESCRIPTIONS = (RideEvent.PICKUP_DESCRIPTION, RideEvent.DROPOFF_DESCRIPTION)
+
+
+def _affects_trip_times(instance):
+    return (
+        instance.description in TRIP_DESCRIPTIONS
+        or getattr(instance, '_loaded_description', None) in TRIP_DESCRIPTIONS
+    )
+
+
+@receiver(post_save, sender=RideEvent)
+def ride_event_saved(sender, instance, **kwargs):
+    if _affects_trip_times(instance):
+        RideService.refresh_trip_times([instance.id_ride_id])
+        CountCache.bump('ride')
+    CountCache.bump('ride_event')
+    RideFragmentCache.invalidate('ride', [instance.id_ride_id])
+    instance._loaded_description = instance.description
+
+
+@receiver(post_delete, sender=RideEvent)
+def ride_event_deleted(sender, instance, **kwargs):
+    if _affects_trip_times(instance):
+        RideService.refresh_trip_times([instance.id_ride_id])
+        CountCache.bump('ride')
+    CountCache.bump('ride_event')
+    RideFragmentCache.invalidate('ride', [instance.id_ride_id])
@@ -1,3 +1,171 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.db import OperationalError
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from ride.models import Ride
+from ride_event.models import RideEvent, RideEventArchive
+from ride_event.services import RideEventService
+from ride_event.write_behind import RideEventWriteBehind, ride_event_write_behind
+from user.models import User
+from user.token_utils import TokenUtils
 
-# Create your tests here.
+
+@override_settings(RIDE_EVENT_WRITE_BEHIND=True, RIDE_EVENT_WRITE_BEHIND_FLUSH_SECONDS=0.01)
+class RideEventWriteBehindTests(TransactionTestCase):
+    # The writer thread has its own connection, so the rows must really be committed.
+
+    def setUp(self):
+        user = User.objects.create(
+            email='rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='', password='hash', role='passenger'
+        )
+        self.ride = Ride.objects.create(
+            status='pickup', id_rider=user, id_driver=user,
+            pickup_latitude=40.7128, pickup_longitude=-74.0060,
+            dropoff_latitude=40.7589, dropoff_longitude=-73.9851,
+            pickup_time=timezone.now(),
+        )
+        self.buffer = RideEventWriteBehind()
+
+    def tearDown(self):
+        self.buffer.shutdown(timeout=5)
+
+    def test_keeps_created_at_from_when_the_event_was_accepted(self):
+        accepted_at = timezone.now() - timedelta(minutes=5)
+        event = RideEvent(id_ride=self.ride, description='Driver on the way', created_at=accepted_at)
+        self.buffer.submit([event])
+        self.assertTrue(self.buffer.flush(timeout=5))
+        self.assertEqual(RideEvent.objects.get(description='Driver on the way').created_at, accepted_at)
+
+    def test_poison_event_is_dropped_without_blocking_the_writer(self):
+        write_events = RideEventService.write_events
+
+        def reject_poison(events):
+            if any(event.description == 'Poison' for event in events):
+                raise ValueError('bad event')
+            return write_events(events)
+
+        with mock.patch.object(RideEventService, 'write_events', side_effect=reject_poison), \
+                self.assertLogs('ride_event.write_behind', level='ERROR') as logs:
+            self.buffer.submit([RideEvent(id_ride=self.ride, description=description) for description in ('Event 1', 'Poison', 'Event 2')])
+            self.assertTrue(self.buffer.flush(timeout=5))
+            self.buffer.submit([RideEvent(id_ride=self.ride, description='Event 3')])
+            self.assertTrue(self.buffer.flush(timeout=5))
+        self.assertTrue(any('Dropping event' in line and 'Poison' in line for line in logs.output))
+        self.assertEqual(
+            sorted(RideEvent.objects.values_list('description', flat=True)), ['Event 1', 'Event 2', 'Event 3']
+        )
+
+    @override_settings(RIDE_EVENT_WRITE_BEHIND_MAX_RETRIES=2)
+    def test_locked_database_is_retried_a_bounded_number_of_times(self):
+        calls = []
+
+        def locked(events):
+            calls.append(len(events))
+            raise OperationalError('database is locked')
+
+        with mock.patch.object(RideEventService, 'write_events', side_effect=locked), \
+                mock.patch('ride_event.write_behind.time.sleep'), \
+                self.assertLogs('ride_event.write_behind', level='ERROR'):
+            self.buffer.submit([RideEvent(id_ride=self.ride, description='Event 1')])
+            self.assertTrue(self.buffer.flush(timeout=5))
+        self.assertEqual(calls, [1, 1, 1])
+        self.assertEqual(self.buffer.pending(), 0)
+
+    def test_drops_only_events_of_deleted_rides(self):
+        other = Ride.objects.create(
+            status='pickup', id_rider=self.ride.id_rider, id_driver=self.ride.id_driver,
+            pickup_latitude=40.7128, pickup_longitude=-74.0060,
+            dropoff_latitude=40.7589, dropoff_longitude=-73.9851,
+            pickup_time=timezone.now(),
+        )
+        events = [RideEvent(id_ride=self.ride, description='Kept'), RideEvent(id_ride_id=other.id_ride, description='Gone')]
+        other.delete()
+        with self.assertLogs('ride_event.write_behind', level='ERROR'):
+            self.buffer.submit(events)
+            self.assertTrue(self.buffer.flush(timeout=5))
+        self.assertEqual(list(RideEvent.objects.values_list('description', flat=True)), ['Kept'])
+
+
+class RideEventBatchTests(TransactionTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        admin = User.objects.create(
+            email='admin@example.com', first_name='Ada', last_name='Admin',
+            phone_number='', password='hash', role='admin'
+        )
+        self.ride = Ride.objects.create(
+            status='pickup', id_rider=admin, id_driver=admin,
+            pickup_latitude=40.7128, pickup_longitude=-74.0060,
+            dropoff_latitude=40.7589, dropoff_longitude=-73.9851,
+            pickup_time=timezone.now(),
+        )
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {TokenUtils.generate_token(admin)}')
+
+    def post(self, body):
+        return self.client.post('/api/ride-events/batch/', body, content_type='application/json')
+
+    def test_status_reflects_how_many_events_were_created(self):
+        good = {'id_ride': self.ride.id_ride, 'description': 'Driver on the way'}
+        missing = {'id_ride': self.ride.id_ride + 1000, 'description': 'Nobody'}
+
+        response = self.post([good, good])
+        self.assertEqual((response.status_code, response.json()['created']), (201, 2))
+
+        response = self.post({'events': [good, missing, {'id_ride': self.ride.id_ride}]})
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([item['status'] for item in response.json()['results']], ['created', 'error', 'error'])
+
+        self.assertEqual(self.post([missing]).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(RideEvent.objects.filter(description='Driver on the way').count(), 3)
+
+        with override_settings(RIDE_EVENT_WRITE_BEHIND=True, RIDE_EVENT_WRITE_BEHIND_FLUSH_SECONDS=0.01):
+            try:
+                self.assertEqual(self.post([good]).status_code, 202)
+                self.assertTrue(ride_event_write_behind.flush(timeout=5))
+            finally:
+                ride_event_write_behind.shutdown(timeout=5)
+        self.assertEqual(RideEvent.objects.filter(description='Driver on the way').count(), 4)
+
+
+class ArchiveRideEventsTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create(
+            email='rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='', password='hash', role='passenger'
+        )
+        self.ride = Ride.objects.create(
+            status='completed', id_rider=user, id_driver=user,
+            pickup_latitude=40.7128, pickup_longitude=-74.0060,
+            dropoff_latitude=40.7589, dropoff_longitude=-73.9851,
+            pickup_time=timezone.now() - timedelta(days=40),
+        )
+        self.pickup_at = timezone.now() - timedelta(days=40)
+        RideEvent.objects.create(id_ride=self.ride, description=RideEvent.PICKUP_DESCRIPTION, created_at=self.pickup_at)
+        RideEvent.objects.create(
+            id_ride=self.ride, description=RideEvent.DROPOFF_DESCRIPTION, created_at=self.pickup_at + timedelta(minutes=20)
+        )
+        RideEvent.objects.create(id_ride=self.ride, description='Rated by rider')
+
+    def test_old_events_move_to_the_archive_and_still_give_trip_times(self):
+        call_command('archive_ride_events', older_than_days=30, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(list(RideEvent.objects.values_list('description', flat=True)), ['Rated by rider'])
+        self.assertEqual(
+            sorted(RideEventArchive.objects.values_list('description', flat=True)),
+            sorted([RideEvent.PICKUP_DESCRIPTION, RideEvent.DROPOFF_DESCRIPTION])
+        )
+        self.ride.refresh_from_db()
+        self.assertEqual(self.ride.trip_duration_seconds, 20 * 60)
+
+        Ride.objects.update(pickup_event_at=None, dropoff_event_at=None, trip_duration_seconds=None)
+        call_command('backfill_trip_times', stdout=StringIO())
+        self.ride.refresh_from_db()
+        self.assertEqual((self.ride.pickup_event_at, self.ride.trip_duration_seconds), (self.pickup_at, 20 * 60))
@@ -1,6 +1,10 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from ride_event.models import RideEvent
 from ride_event.serializers import RideEventSerializer
+from ride_event.services import RideEventService
+from ride_event.write_behind import BufferFull, ride_event_write_behind
 from user.permissions import IsAdminRole
 
 
@@ -8,4 +12,64 @@ class RideEventViewSet(viewsets.ModelViewSet):
     queryset = RideEvent.objects.all()
     serializer_class = RideEventSerializer
     permission_classes = [IsAdminRole]
-    lookup_field = 'id_ride_event'
\ No newline at end of file
+    lookup_field = 'id_ride_event'
+
+    @staticmethod
+    def _buffer_full(error):
+        response = Response({
+            'status': 'error',
+            'message': f'Too many events are waiting to be written, retry shortly. ({error})'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+
+    def create(self, request, *args, **kwargs):
+        if not ride_event_write_behind.enabled:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            ride_event_write_behind.submit([RideEvent(**serializer.validated_data)])
+        except BufferFull as e:
+            return self._buffer_full(e)
+        return Response({
+            'status': 'accepted',
+            'data': {'id_ride': serializer.validated_data['id_ride'].id_ride, 'description': serializer.validated_data['description']}
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['POST'], url_path='batch')
+    def batch(self, request):
+        items = request.data.get('events') if isinstance(request.data, dict) else request.data
+
+        if not isinstance(items, list) or not items:
+            return Response({
+                'status': 'error',
+                'message': 'Send a non-empty array of events (or {"events": [...]}).'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = RideEventService.max_batch_size()
+        if len(items) > max_size:
+            return Response({
+                'status': 'error',
+                'message': f'A batch can hold at most {max_size} events.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results, created = RideEventService.create_events(items)
+        except BufferFull as e:
+            return self._buffer_full(e)
+
+        if created == len(items):
+            response_status = status.HTTP_202_ACCEPTED if ride_event_write_behind.enabled else status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({
+            'status': 'success' if created == len(items) else ('partial' if created else 'error'),
+            'created': created,
+            'failed': len(items) - created,
+            'results': results
+        }, status=response_status)
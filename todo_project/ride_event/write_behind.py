@@ -0,0 +1,185 @@
+import atexit
+import logging
+import threading
+import time
+from typing import List
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """The write-behind buffer stayed full for the whole enqueue timeout."""
+
+
+class RideEventWriteBehind:
+    """
+    Opt-in (`RIDE_EVENT_WRITE_BEHIND = True`) in-process buffer for RideEvent inserts.
+
+    Requests hand their events to `submit()` and return once the events are buffered. A single
+    writer thread inserts them with bulk_create, one transaction per batch of up to
+    `RIDE_EVENT_WRITE_BEHIND_BATCH_SIZE` events or every `RIDE_EVENT_WRITE_BEHIND_FLUSH_SECONDS`,
+    so concurrent bursts no longer compete for SQLite's write lock. When the buffer holds
+    `RIDE_EVENT_WRITE_BEHIND_QUEUE_SIZE` events, `submit()` blocks for up to
+    `RIDE_EVENT_WRITE_BEHIND_ENQUEUE_TIMEOUT` seconds and then raises BufferFull.
+
+    Transient failures ("database is locked") are retried with backoff, up to
+    `RIDE_EVENT_WRITE_BEHIND_MAX_RETRIES` times. Any other error (a ride deleted in the meantime,
+    bad data) makes the writer insert the batch one event at a time, so only the events that fail
+    on their own are dropped. Dropped events are logged at ERROR level with their ride and
+    description. Events keep the `created_at` they got when accepted, however late they are
+    written. At interpreter exit the buffer is drained for up to
+    `RIDE_EVENT_WRITE_BEHIND_SHUTDOWN_TIMEOUT` seconds; events still buffered then, or when the
+    process is killed outright (SIGKILL, OOM), are lost.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = []
+        self._thread = None
+        self._stopping = False
+        self._in_flight = 0
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'RIDE_EVENT_WRITE_BEHIND', False)
+
+    @staticmethod
+    def _setting(name, default):
+        return getattr(settings, f'RIDE_EVENT_WRITE_BEHIND_{name}', default)
+
+    def _ensure_writer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='ride-event-write-behind', daemon=True)
+            self._thread.start()
+
+    def submit(self, events: List) -> None:
+        """Buffer `events` for insertion, all or none; raises BufferFull when there is no room in time."""
+        max_size = self._setting('QUEUE_SIZE', 10000)
+        if len(events) > max_size:
+            raise BufferFull(f'{len(events)} events exceed the buffer size of {max_size}.')
+        deadline = time.monotonic() + self._setting('ENQUEUE_TIMEOUT', 1.0)
+        with self._condition:
+            if self._stopping:
+                raise BufferFull('The write-behind buffer is shutting down.')
+            self._ensure_writer()
+            while len(self._pending) + len(events) > max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BufferFull(f'The write-behind buffer is full ({max_size} events).')
+                self._condition.wait(remaining)
+            self._pending.extend(events)
+            self._condition.notify_all()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._pending) + self._in_flight
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything submitted so far is written; False if `timeout` ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = None):
+        """Stop accepting events, write what is buffered and stop the writer thread."""
+        with self._condition:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def shutdown_at_exit(self):
+        # Bounded, so a batch stuck in retries cannot hang interpreter exit.
+        self.shutdown(timeout=self._setting('SHUTDOWN_TIMEOUT', 10.0))
+
+    def _take_batch(self):
+        batch_size = self._setting('BATCH_SIZE', 500)
+        flush_seconds = self._setting('FLUSH_SECONDS', 0.2)
+        with self._condition:
+            # A batch is written once it is full, or `flush_seconds` after its first event arrived.
+            deadline = None
+            while len(self._pending) < batch_size and not self._stopping:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                if deadline is None:
+                    deadline = time.monotonic() + flush_seconds
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:batch_size]
+            del self._pending[:batch_size]
+            self._in_flight = len(batch)
+            # Producers blocked on a full buffer can go on.
+            self._condition.notify_all()
+            return batch
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._take_batch()
+                if batch:
+                    self._write(batch)
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+                    if self._stopping and not self._pending:
+                        return
+        finally:
+            connections.close_all()
+
+    def _write(self, batch):
+        try:
+            if self._write_with_retries(batch):
+                return
+        except Exception:
+            # Not transient (a deleted ride, bad data): find the events that fail on their own.
+            logger.exception('Write-behind batch of %d events failed, writing them one by one', len(batch))
+            for event in batch:
+                try:
+                    written = self._write_with_retries([event])
+                except Exception:
+                    logger.exception('Write-behind event failed')
+                    written = False
+                if not written:
+                    self._drop([event])
+            return
+        self._drop(batch)
+
+    def _write_with_retries(self, events) -> bool:
+        """Write `events`, retrying transient errors; False once the retries are used up."""
+        from ride_event.services import RideEventService
+        delay = 0.05
+        for attempt in range(self._setting('MAX_RETRIES', 10) + 1):
+            if attempt:
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+            close_old_connections()
+            try:
+                RideEventService.write_events(events)
+                return True
+            except OperationalError as e:
+                # Typically "database is locked".
+                logger.warning('Write-behind batch of %d events failed (attempt %d): %s', len(events), attempt + 1, e)
+        return False
+
+    @staticmethod
+    def _drop(events):
+        for event in events:
+            logger.error('Dropping event for ride %s: %s', event.id_ride_id, event.description)
+
+
+ride_event_write_behind = RideEventWriteBehind()
+atexit.register(ride_event_write_behind.shutdown_at_exit)
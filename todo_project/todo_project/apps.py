@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class TodoProjectConfig(AppConfig):
+    name = 'todo_project'
+
+    def ready(self):
+        import todo_project.database  # noqa: F401
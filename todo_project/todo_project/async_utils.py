@@ -0,0 +1,48 @@
+import contextvars
+import functools
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _closing_connections(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def run_db_concurrently(func, *args, **kwargs):
+    """
+    Run a blocking ORM call on a worker thread with its own database connection.
+
+    Django's async ORM methods (`acount()`, `aget()`, ...) all go through one
+    thread-sensitive executor per request, so gathering them still runs the queries
+    one after another. Independent queries awaited through this helper overlap.
+    """
+    return sync_to_async(_closing_connections(func), thread_sensitive=False)(*args, **kwargs)
+
+
+async def iterate_in_thread(iterator):
+    """
+    Async iterator over a blocking iterator, pulling one item per hop to the request's sync thread.
+
+    StreamingHttpResponse buffers a sync iterator whole under ASGI; this keeps it streaming.
+    Every item is produced on the same thread (thread-sensitive) and inside one context, so a
+    database cursor and ContextVars such as the read routing carry over from item to item.
+    """
+    context = contextvars.copy_context()
+    step = sync_to_async(context.run, thread_sensitive=True)
+    done = object()
+    try:
+        while True:
+            item = await step(next, iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await step(close)
@@ -0,0 +1,123 @@
+import hashlib
+import json
+from typing import Iterable, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Tags, Warning, register
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+
+
+class CountCache:
+    """
+    Cache of COUNT(*) results for paginated list endpoints.
+
+    Keys are built from the endpoint namespace, the normalized filter set and a generation
+    number per model. Saving or deleting a Ride/RideEvent/User bumps that model's generation (see the
+    app signals), which orphans every cached count depending on it in O(1).
+
+    Generations and counts live in the `default` cache, which every server process must share
+    (Redis, Memcached, database): with the per-process LocMemCache a write only bumps the
+    generation of the process that made it, and the others serve stale counts for up to
+    COUNT_CACHE_TIMEOUT. LocMemCache is only correct for a single process (see `check_shared_cache`).
+    """
+
+    GENERATION_KEY = 'count_cache:generation:{}'
+
+    @staticmethod
+    def _timeout() -> int:
+        return getattr(settings, 'COUNT_CACHE_TIMEOUT', 300)
+
+    @staticmethod
+    def normalize_filters(filters: dict) -> str:
+        normalized = {}
+        for key, value in filters.items():
+            if value is None or value == '':
+                continue
+            if isinstance(value, str):
+                value = value.strip().lower() if key == 'email' else value.strip()
+            elif isinstance(value, tuple):
+                value = list(value)
+            normalized[key] = value
+        return json.dumps(normalized, sort_keys=True, default=str)
+
+    @classmethod
+    def bump(cls, model_label: str):
+        key = cls.GENERATION_KEY.format(model_label)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    @classmethod
+    def generations(cls, depends_on: Iterable[str]) -> str:
+        """Current generations of `depends_on`, for keys that must change on any write to those models."""
+        keys = [cls.GENERATION_KEY.format(label) for label in depends_on]
+        values = cache.get_many(keys)
+        return '.'.join(str(values.get(key, 0)) for key in keys)
+
+    @staticmethod
+    def estimate_table_count(queryset: QuerySet) -> Optional[int]:
+        """Cheap row estimate for an unfiltered table, or None when the backend offers none."""
+        model = queryset.model
+        table = model._meta.db_table
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+                row = cursor.fetchone()
+                if row and row[0] >= 0:
+                    return row[0]
+                return None
+            if connection.vendor == 'sqlite':
+                try:
+                    # Populated by ANALYZE; the first number of `stat` is the table's row count.
+                    cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                except DatabaseError:
+                    # No ANALYZE yet: sqlite_stat1 does not exist.
+                    return None
+                row = cursor.fetchone()
+                if row and row[0]:
+                    return int(row[0].split()[0])
+        return None
+
+    @classmethod
+    def count(cls, namespace: str, queryset: QuerySet, filters: dict = None,
+              depends_on: Iterable[str] = (), estimate: bool = False) -> int:
+        """
+        Return queryset.count(), served from the cache when the filter set and the
+        generations of `depends_on` are unchanged. With `estimate=True` and no filters,
+        a backend table estimate is used instead when there is one (cached the same way).
+        """
+        normalized = cls.normalize_filters(filters or {})
+        estimated = estimate and normalized == '{}'
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        key = f'count_cache:{namespace}:{cls.generations(depends_on)}:{digest}{":estimated" if estimated else ""}'
+        total_count = cache.get(key)
+        if total_count is None:
+            total_count = cls.estimate_table_count(queryset) if estimated else None
+            if total_count is None:
+                total_count = queryset.count()
+            cache.set(key, total_count, cls._timeout())
+        return total_count
+
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    `check --deploy` warning for counts cached per process. A deployment that really runs a
+    single process can silence it with SILENCED_SYSTEM_CHECKS = ['todo_project.W001'].
+    """
+    if settings.CACHES.get('default', {}).get('BACKEND') not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'The default cache is process-local, so CountCache generations and counts are not shared '
+        'between server processes.',
+        hint='Point CACHES["default"] at a shared backend (Redis, Memcached, database) when running '
+             'more than one process; writes in one process leave the others with stale counts.',
+        obj='todo_project.count_cache',
+        id='todo_project.W001',
+    )]
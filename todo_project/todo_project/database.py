@@ -0,0 +1,110 @@
+import functools
+import inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+_use_read_replica = ContextVar('use_read_replica', default=False)
+
+
+def read_alias():
+    """The configured read alias, or None when reads stay on `default`."""
+    alias = getattr(settings, 'DATABASE_READ_ALIAS', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+@contextmanager
+def read_replica():
+    """Send the reads issued inside this block to DATABASE_READ_ALIAS."""
+    token = _use_read_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_read_replica.reset(token)
+
+
+@contextmanager
+def read_primary():
+    """Send the reads issued inside this block to `default`, even within `read_replica()`."""
+    token = _use_read_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_read_replica.reset(token)
+
+
+def read_only(func):
+    """
+    Run a read-only service method against the read alias.
+
+    Works on plain, generator and coroutine functions; queries a coroutine hands to
+    worker threads through sync_to_async inherit the routing with the context.
+    """
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            with read_replica():
+                yield from func(*args, **kwargs)
+        return generator_wrapper
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def coroutine_wrapper(*args, **kwargs):
+            with read_replica():
+                return await func(*args, **kwargs)
+        return coroutine_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with read_replica():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """
+    Routes reads made under `read_replica()` / `@read_only` to DATABASE_READ_ALIAS.
+
+    Everything else, writes and reads inside a transaction on `default` included, uses
+    `default`, so a request that writes then reads sees its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias()
+        if alias is None or not _use_read_replica.get():
+            return None
+        if connections['default'].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica's schema and rows come from the primary (see sync_read_replica).
+        if db == read_alias():
+            return False
+        return None
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection; read aliases are also made query-only."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if connection.alias == read_alias():
+        pragmas['query_only'] = 'ON'
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+connection_created.connect(apply_sqlite_pragmas, dispatch_uid='apply_sqlite_pragmas')
@@ -0,0 +1,28 @@
+import sqlite3
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from todo_project.database import read_alias
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto the DATABASE_READ_ALIAS file (local stand-in for replication)'
+
+    def handle(self, *args, **options):
+        alias = read_alias()
+        if alias is None:
+            raise CommandError('DATABASE_READ_ALIAS is not set to a configured database.')
+        primary = connections['default'].settings_dict
+        replica = connections[alias].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or replica['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_read_replica only copies SQLite databases.')
+
+        connections[alias].close()
+        # The backup API copies a consistent snapshot even while the primary is being written to.
+        source = sqlite3.connect(str(primary['NAME']))
+        target = sqlite3.connect(str(replica['NAME']))
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f"Copied {primary['NAME']} to {replica['NAME']}."))
@@ -0,0 +1,126 @@
+import base64
+import json
+from typing import Optional, Sequence
+from django.db.models import Q, QuerySet
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def build_page_link(query_params, **overrides) -> str:
+    """Relative link to another page that keeps every active filter of the current request."""
+    params = query_params.copy()
+    for key, value in overrides.items():
+        if value is None:
+            params.pop(key, None)
+        else:
+            params[key] = value
+    return f"?{params.urlencode()}"
+
+
+def paginated_response_body(query_params, result: dict, data: list) -> dict:
+    """Response body for a service page result, in either page-number or cursor mode."""
+    if 'next_cursor' in result:
+        return {
+            'page_size': result['page_size'],
+            'next': build_page_link(query_params, cursor=result['next_cursor']) if result['next_cursor'] else None,
+            'previous': build_page_link(query_params, cursor=result['previous_cursor']) if result['previous_cursor'] else None,
+            'results': data
+        }
+
+    page = result['page']
+    page_size = result['page_size']
+    return {
+        'count': result['count'],
+        'page': page,
+        'page_size': page_size,
+        'total_pages': result['total_pages'],
+        'next': build_page_link(query_params, page=page + 1, page_size=page_size) if page < result['total_pages'] else None,
+        'previous': build_page_link(query_params, page=page - 1, page_size=page_size) if page > 1 else None,
+        'results': data
+    }
+
+
+class KeysetPaginator:
+    """
+    Seek ("cursor") pagination over a unique ordering such as (pickup_time, id_ride).
+
+    Each page is fetched with a WHERE on the last seen key instead of OFFSET, and no
+    COUNT query is issued, so every page costs the same no matter how deep it is.
+    Cursors are opaque url-safe base64 JSON blobs holding the boundary key values.
+    """
+
+    def __init__(self, fields: Sequence[str], descending: bool = True):
+        self.fields = tuple(fields)
+        self.descending = descending
+
+    def encode_cursor(self, obj, reverse: bool = False) -> str:
+        values = []
+        for name in self.fields:
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, model, cursor: str):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            raw_values = payload['v']
+            reverse = bool(payload.get('r', False))
+            if len(raw_values) != len(self.fields):
+                raise InvalidCursor('Invalid cursor.')
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, raw_values)
+            ]
+        except InvalidCursor:
+            raise
+        except Exception:
+            raise InvalidCursor('Invalid cursor.')
+        return values, reverse
+
+    def _seek_filter(self, values, forward_descending: bool) -> Q:
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y), expanded for any number of fields.
+        lookup = 'lt' if forward_descending else 'gt'
+        condition = Q()
+        for i, name in enumerate(self.fields):
+            step = Q(**{f'{name}__{lookup}': values[i]})
+            for prev_name, prev_value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def _ordering(self, descending: bool):
+        prefix = '-' if descending else ''
+        return [f'{prefix}{name}' for name in self.fields]
+
+    def paginate(self, queryset: QuerySet, cursor: Optional[str], page_size: int) -> dict:
+        """Return {'results', 'next_cursor', 'previous_cursor'} for the page after/before `cursor`."""
+        reverse = False
+        descending = self.descending
+        if cursor:
+            values, reverse = self.decode_cursor(queryset.model, cursor)
+            descending = self.descending != reverse
+            queryset = queryset.filter(self._seek_filter(values, descending))
+
+        rows = list(queryset.order_by(*self._ordering(descending))[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = None
+        previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = self.encode_cursor(rows[-1])
+            if cursor and (has_more or not reverse):
+                previous_cursor = self.encode_cursor(rows[0], reverse=True)
+
+        return {
+            'results': rows,
+            'next_cursor': next_cursor,
+            'previous_cursor': previous_cursor,
+        }
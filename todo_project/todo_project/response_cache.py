@@ -0,0 +1,97 @@
+import hashlib
+from typing import Callable, Iterable
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from todo_project.count_cache import CountCache
+from todo_project.sql_instrumentation import record_serialize
+
+
+class ResponseCache:
+    """
+    Cache of rendered JSON responses for read endpoints that are polled with the same parameters.
+
+    Keys combine the endpoint namespace, the requester's role, the normalized query string and
+    the CountCache generations of the models the response is built from, so any Ride, RideEvent or
+    User write makes the cached entries unreachable. Entries live in the bounded `responses` cache
+    (LocMemCache culls the least recently used entries once MAX_ENTRIES is reached) and expire after
+    its TIMEOUT, which bounds the drift of time-based fields such as `todays_ride_events`.
+
+    Responses carry a strong ETag (a digest of the body); a matching If-None-Match gets a 304.
+    """
+
+    CACHE_ALIAS = 'responses'
+    DEPENDS_ON = ('ride', 'ride_event', 'user')
+
+    @staticmethod
+    def normalize_params(query_params) -> str:
+        items = []
+        for key in sorted(query_params.keys()):
+            for value in query_params.getlist(key):
+                value = value.strip()
+                if value != '':
+                    items.append(f'{key}={value}')
+        return '&'.join(items)
+
+    @classmethod
+    def make_key(cls, request, namespace: str, depends_on: Iterable[str]) -> str:
+        role = getattr(request.user, 'role', None)
+        digest = hashlib.sha1(
+            f'{request.path}?{cls.normalize_params(request.query_params)}'.encode('utf-8')
+        ).hexdigest()
+        return f'response_cache:{namespace}:{role}:{CountCache.generations(depends_on)}:{digest}'
+
+    @staticmethod
+    def _not_modified(request, etag: str) -> bool:
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if not if_none_match:
+            return False
+        etags = parse_etags(if_none_match)
+        # If-None-Match uses the weak comparison: W/"x" matches "x".
+        return '*' in etags or etag in etags or f'W/{etag}' in etags
+
+    @staticmethod
+    def _response(content: bytes, etag: str):
+        response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @classmethod
+    def respond(cls, request, namespace: str, build: Callable[[], Response],
+                depends_on: Iterable[str] = DEPENDS_ON):
+        """
+        Return the cached response for this request, or call `build()` and cache its result.
+
+        Only successful JSON responses are cached; errors and other renderers (e.g. the
+        browsable API) go through `build()` untouched.
+        """
+        renderer = getattr(request, 'accepted_renderer', None)
+        if renderer is not None and renderer.format != 'json':
+            return build()
+
+        cache = caches[cls.CACHE_ALIAS]
+        key = cls.make_key(request, namespace, depends_on)
+        entry = cache.get(key)
+        if entry is None:
+            response = build()
+            if response.status_code != 200:
+                return response
+            # Views may hand back already rendered JSON (see RideFragmentCache.response).
+            if isinstance(response, Response):
+                with record_serialize():
+                    content = JSONRenderer().render(response.data)
+            else:
+                content = response.content
+            entry = (quote_etag(hashlib.sha1(content).hexdigest()), content)
+            cache.set(key, entry)
+
+        etag, content = entry
+        if cls._not_modified(request, etag):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        return cls._response(content, etag)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'todo_project.sql_instrumentation.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,6 +86,22 @@ DATABASES = {
     }
 }
 
+# Read-only RideService/UserService queries go to DATABASE_READ_ALIAS when it names a configured
+# database (see todo_project/database.py); writes always go to `default`. For local testing set
+# DATABASE_READ_ALIAS=replica and refresh the copy with `python manage.py sync_read_replica`.
+DATABASE_READ_ALIAS = os.environ.get('DATABASE_READ_ALIAS') or None
+if DATABASE_READ_ALIAS == 'replica':
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DATABASE_REPLICA_NAME', BASE_DIR / 'db.replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['todo_project.database.ReadReplicaRouter']
+
+# PRAGMAs applied to every new SQLite connection (see settings_production.py).
+SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -132,3 +150,69 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
+
+# Seconds a cached COUNT(*) for a list endpoint is kept (see todo_project/count_cache.py).
+# Ride/User writes invalidate entries immediately; the timeout bounds staleness from bulk updates.
+COUNT_CACHE_TIMEOUT = 300
+
+# Seconds a user's token version is cached for auth checks (see user/token_utils.py). save(),
+# delete() and TokenUtils.revoke() drop it at once; the timeout bounds staleness from bulk updates.
+TOKEN_VERSION_CACHE_TIMEOUT = 300
+
+# A query shape repeated this many times within one request is logged as a probable N+1
+# (see todo_project/sql_instrumentation.py).
+SQL_N_PLUS_ONE_THRESHOLD = 5
+
+# `default` holds the CountCache generations and counts (see todo_project/count_cache.py) and must be
+# shared by every server process: LocMemCache only suits a single process (runserver, one worker);
+# use Redis/Memcached/database otherwise (`manage.py check --deploy` warns: todo_project.W001).
+# `responses` holds rendered ride list/detail responses (see todo_project/response_cache.py).
+# LocMemCache evicts the least recently used tenth of the entries once MAX_ENTRIES is reached;
+# writes invalidate entries immediately and TIMEOUT bounds the drift of `todays_ride_events`.
+# `ride_fragments` holds each ride's rendered JSON plus the version tokens keying it
+# (see ride/fragment_cache.py); version tokens never expire but are evicted like the fragments.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    'ride_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ride_fragments',
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+# Build JSON ride list pages from cached per-ride fragments, serializing only the rides
+# that changed (see ride/fragment_cache.py).
+RIDE_FRAGMENT_CACHE = True
+
+# Largest array accepted by POST /api/ride-events/batch/.
+RIDE_EVENT_BATCH_MAX_SIZE = 1000
+
+# Buffer RideEvent inserts in-process and write them in batches from one thread
+# (see ride_event/write_behind.py). POSTs then answer 202 once the event is buffered.
+RIDE_EVENT_WRITE_BEHIND = False
+RIDE_EVENT_WRITE_BEHIND_QUEUE_SIZE = 10000
+RIDE_EVENT_WRITE_BEHIND_BATCH_SIZE = 500
+RIDE_EVENT_WRITE_BEHIND_FLUSH_SECONDS = 0.2
+RIDE_EVENT_WRITE_BEHIND_ENQUEUE_TIMEOUT = 1.0
+# Retries of a batch failing with "database is locked" before its events are dropped (logged).
+RIDE_EVENT_WRITE_BEHIND_MAX_RETRIES = 10
+# Seconds the buffer may take to drain at interpreter exit.
+RIDE_EVENT_WRITE_BEHIND_SHUTDOWN_TIMEOUT = 10.0
+
+# Age in days after which `archive_ride_events` moves RideEvents to ride_event_archive.
+RIDE_EVENT_RETENTION_DAYS = 30
@@ -0,0 +1,229 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger('todo_project.sql')
+
+# `IN (%s, %s, %s)` lists and inlined numbers vary between calls of the same query.
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def query_shape(sql):
+    """The SQL text with parameter lists and numeric literals collapsed, used to group repeated queries."""
+    return _NUMBER.sub('?', _PLACEHOLDER_LIST.sub('%s, ...', sql))
+
+
+class RequestSQLStats:
+    """Queries executed while handling one request, across every thread that served it."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.serialize_duration = None
+        self._render_started = None
+        self._lock = threading.Lock()
+
+    def record(self, sql, duration):
+        shape = query_shape(sql)
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            self.shapes[shape] += 1
+
+    def add_serialize(self, duration):
+        with self._lock:
+            self.serialize_duration = (self.serialize_duration or 0.0) + duration
+
+    def repeated_shapes(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_current_stats = ContextVar('sql_instrumentation_stats', default=None)
+_STREAM_END = object()
+
+
+@contextmanager
+def record_serialize():
+    """
+    Count the time spent in this block as `serialize`, for responses rendered outside DRF's
+    template-response path (e.g. by ResponseCache), which process_template_response never sees.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_serialize(time.perf_counter() - start)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record(sql, time.perf_counter() - start)
+
+
+def _install(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    # Covers connections opened on worker threads (see todo_project/async_utils.py).
+    _install(connection)
+
+
+connection_created.connect(_on_connection_created, dispatch_uid='sql_instrumentation')
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Measures the SQL a request issues and reports it in a `Server-Timing` header:
+
+        Server-Timing: db;dur=12.4;desc="7 queries", serialize;dur=0.8, total;dur=15.1
+
+    `serialize` is the time spent rendering a DRF/template response. When one query shape runs
+    `SQL_N_PLUS_ONE_THRESHOLD` times or more within a request (typically a per-row query in a
+    serializer whose prefetch is missing), a JSON line is logged to the `todo_project.sql` logger.
+
+    A streaming response (the rides export) runs most of its queries while its body is sent, after
+    the headers are gone: its header only covers the queries before the body (`desc` says so), and
+    the queries of the body are recorded too and reported in a `streamed_response` JSON line once
+    the stream ends.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self._finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self._finish(request, response, stats, start)
+
+    def _start(self):
+        for connection in connections.all():
+            _install(connection)
+        stats = RequestSQLStats()
+        return stats, _current_stats.set(stats), time.perf_counter()
+
+    def process_template_response(self, request, response):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats._render_started = time.perf_counter()
+
+            def rendered(response):
+                stats.add_serialize(time.perf_counter() - stats._render_started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def _finish(self, request, response, stats, start):
+        total = time.perf_counter() - start
+        description = f'{stats.count} queries before the body' if response.streaming else f'{stats.count} queries'
+        metrics = [f'db;dur={stats.duration * 1000:.1f};desc="{description}"']
+        if stats.serialize_duration is not None:
+            metrics.append(f'serialize;dur={stats.serialize_duration * 1000:.1f}')
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = ', '.join(([existing] if existing else []) + metrics)
+
+        if response.streaming:
+            content = response.streaming_content
+            if response.is_async:
+                response.streaming_content = self._measure_async_stream(request, response, stats, start, content)
+            else:
+                response.streaming_content = self._measure_stream(request, response, stats, start, content)
+        else:
+            self._log_repeated_shapes(request, response, stats)
+        return response
+
+    def _measure_stream(self, request, response, stats, start, content):
+        try:
+            while True:
+                token = _current_stats.set(stats)
+                try:
+                    chunk = next(content, _STREAM_END)
+                finally:
+                    _current_stats.reset(token)
+                if chunk is _STREAM_END:
+                    return
+                yield chunk
+        finally:
+            self._stream_ended(request, response, stats, start)
+
+    async def _measure_async_stream(self, request, response, stats, start, content):
+        try:
+            while True:
+                token = _current_stats.set(stats)
+                try:
+                    chunk = await anext(content, _STREAM_END)
+                finally:
+                    _current_stats.reset(token)
+                if chunk is _STREAM_END:
+                    return
+                yield chunk
+        finally:
+            self._stream_ended(request, response, stats, start)
+
+    def _stream_ended(self, request, response, stats, start):
+        logger.info(json.dumps({
+            'event': 'streamed_response',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'query_count': stats.count,
+            'db_ms': round(stats.duration * 1000, 1),
+            'total_ms': round((time.perf_counter() - start) * 1000, 1),
+        }))
+        self._log_repeated_shapes(request, response, stats)
+
+    def _log_repeated_shapes(self, request, response, stats):
+        for shape, count in stats.repeated_shapes(self.threshold):
+            logger.warning(json.dumps({
+                'event': 'probable_n_plus_one',
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'count': count,
+                'query_count': stats.count,
+                'db_ms': round(stats.duration * 1000, 1),
+                'shape': shape,
+            }))
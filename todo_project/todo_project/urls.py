@@ -19,6 +19,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from user.views import UserViewSet
 from ride.views import RideViewSet
+from ride import async_views as ride_async_views
 from ride_event.views import RideEventViewSet
 
 # Create a router and register our viewsets
@@ -29,5 +30,8 @@ router.register(r'ride-events', RideEventViewSet, basename='ride-event')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Async (ASGI) variants of the ride list endpoints; same parameters and response shape.
+    path('api/async/rides/', ride_async_views.ride_list, name='ride-async-list'),
+    path('api/async/rides/with_duration/', ride_async_views.ride_with_duration, name='ride-async-with-duration'),
     path('api/', include(router.urls)),  # API endpoints will be at /api/users/, /api/rides/, etc.
 ]
@@ -0,0 +1,37 @@
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+from user.models import User
+
+
+class UserEmailSearch:
+    """
+    Case-insensitive substring search on User.email.
+
+    On SQLite, terms of three characters or more are matched against the `user_email_search`
+    FTS5 trigram table (kept in sync with the `user` table by triggers, see
+    user/migrations/0004_user_email_search.py), which finds matches without reading every
+    email. Shorter terms and other backends fall back to `email__icontains` on the user table.
+    """
+
+    TABLE = 'user_email_search'
+    MIN_TRIGRAM_LENGTH = 3
+
+    @staticmethod
+    def _phrase(term: str) -> str:
+        # An FTS5 string literal: the term is matched as-is, operators and all.
+        return '"' + term.replace('"', '""') + '"'
+
+    @classmethod
+    def matching_user_ids(cls, term: str, using: str = None):
+        """
+        The ids of users whose email contains `term`, as a subquery for `__in` lookups.
+
+        Without `using` the fallback queryset is left unpinned, so it runs on whichever database
+        the outer query is routed to (e.g. the read alias under `@read_only`).
+        """
+        term = term.strip()
+        vendor = connections[using or router.db_for_read(User)].vendor
+        if vendor == 'sqlite' and len(term) >= cls.MIN_TRIGRAM_LENGTH:
+            return RawSQL(f'SELECT rowid FROM {cls.TABLE} WHERE email MATCH %s', (cls._phrase(term),))
+        queryset = User.objects.using(using) if using else User.objects.all()
+        return queryset.filter(email__icontains=term).values('id_user')
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-02-22 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id_user', models.AutoField(db_column='id_user', primary_key=True, serialize=False)),
+                ('role', models.CharField(choices=[('admin', 'Admin'), ('user', 'User'), ('driver', 'Driver'), ('passenger', 'Passenger')], default='user', max_length=50)),
+                ('first_name', models.CharField(max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('email', models.CharField(max_length=255, unique=True)),
+                ('phone_number', models.CharField(max_length=20)),
+            ],
+            options={
+                'verbose_name': 'User',
+                'verbose_name_plural': 'Users',
+                'db_table': 'user',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-02-22 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='password',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS user_email_search USING fts5(email, tokenize = 'trigram')
+    """,
+    """
+    INSERT INTO user_email_search (rowid, email)
+    SELECT id_user, email FROM "user"
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_email_search_insert AFTER INSERT ON "user"
+    BEGIN
+        INSERT INTO user_email_search (rowid, email) VALUES (NEW.id_user, NEW.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_email_search_update AFTER UPDATE OF email ON "user"
+    BEGIN
+        UPDATE user_email_search SET email = NEW.email WHERE rowid = NEW.id_user;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_email_search_delete AFTER DELETE ON "user"
+    BEGIN
+        DELETE FROM user_email_search WHERE rowid = OLD.id_user;
+    END
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS user_email_search_delete',
+    'DROP TRIGGER IF EXISTS user_email_search_update',
+    'DROP TRIGGER IF EXISTS user_email_search_insert',
+    'DROP TABLE IF EXISTS user_email_search',
+]
+
+
+def create_email_search(apps, schema_editor):
+    # FTS5 trigram tables are SQLite-only; other backends fall back to icontains on the user table.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_email_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_search, drop_email_search),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:24
+
+from importlib import import_module
+from django.db import migrations, models
+
+
+email_search = import_module('user.migrations.0004_user_email_search')
+
+
+def create_email_search_triggers(apps, schema_editor):
+    # SQLite adds a NOT NULL column by rebuilding the table, which drops the triggers keeping
+    # user_email_search in sync (the FTS table itself and its rows are untouched).
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in email_search.CREATE_SQL:
+        if 'CREATE TRIGGER' in sql:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_user_email_search'),
+    ]
+
+    operations = [
+        # Also after RemoveField when migrating backwards.
+        migrations.RunPython(migrations.RunPython.noop, create_email_search_triggers),
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(create_email_search_triggers, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.hashers import make_password, check_password
 
 class User(models.Model):    
@@ -16,6 +17,8 @@ class User(models.Model):
     email = models.CharField(max_length=255, unique=True)
     phone_number = models.CharField(max_length=20)
     password = models.CharField(max_length=255)
+    # Signed into every auth token; bumped when the role or password changes, which revokes older tokens.
+    token_version = models.PositiveIntegerField(default=0)
     
     def set_password(self, raw_password):
         self.password = make_password(raw_password)
@@ -23,6 +26,64 @@ class User(models.Model):
     def check_password(self, raw_password):
         return check_password(raw_password, self.password)
     
+    # Changing either of these revokes the user's tokens (see TokenUtils).
+    TOKEN_FIELDS = ('role', 'password')
+    
+    def _token_snapshot(self):
+        deferred = self.get_deferred_fields()
+        return {name: getattr(self, name) for name in self.TOKEN_FIELDS if name not in deferred}
+    
+    def save(self, *args, **kwargs):
+        revoke = False
+        version_expression = False
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            deferred = self.get_deferred_fields()
+            loaded = getattr(self, '_token_state', {})
+            # Deferred fields are not saved; a field assigned without ever being loaded counts as changed.
+            revoke = any(
+                name not in loaded or loaded[name] != getattr(self, name)
+                for name in self.TOKEN_FIELDS
+                if name not in deferred and (update_fields is None or name in update_fields)
+            )
+            if 'token_version' not in deferred and (update_fields is None or revoke):
+                # Never write token_version back from memory: an instance loaded before a
+                # revocation would undo it. It is kept, or incremented, in SQL.
+                in_memory = self.token_version
+                self.token_version = F('token_version') + 1 if revoke else F('token_version')
+                version_expression = True
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        if revoke:
+            if not version_expression:
+                type(self)._base_manager.filter(pk=self.pk).update(token_version=F('token_version') + 1)
+            from user.token_utils import TokenUtils
+            TokenUtils.forget_version(self.pk)
+            self.refresh_from_db(fields=['token_version'])
+        elif version_expression:
+            self.token_version = in_memory
+        self._token_state = self._token_snapshot()
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Also reached when a deferred role/password is first read.
+        deferred = self.get_deferred_fields()
+        self._token_state = {
+            **getattr(self, '_token_state', {}),
+            **{name: getattr(self, name) for name in self.TOKEN_FIELDS
+               if name not in deferred and (fields is None or name in fields)},
+        }
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the auth token was issued against so a role/password change can revoke it.
+        instance._token_state = {
+            name: value for name, value in zip(field_names, values) if name in cls.TOKEN_FIELDS
+        }
+        return instance
+    
     def to_serializer_data(self):
         from user.serializers import UserSerializer
         serializer = UserSerializer(self)
@@ -32,6 +93,9 @@ class User(models.Model):
         db_table = 'user'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            models.Index(fields=['role'], name='user_role_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
@@ -1,11 +1,12 @@
 from rest_framework import permissions
 from user.models import User
+from user.token_utils import TokenUser
 
 
 class IsAdminRole(permissions.BasePermission):
     
     def has_permission(self, request, view):
-        if not request.user or not isinstance(request.user, User):
+        if not request.user or not isinstance(request.user, (User, TokenUser)):
             return False
         
         return request.user.role == 'admin'
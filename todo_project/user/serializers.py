@@ -5,5 +5,8 @@ from user.models import User
 class UserSerializer(serializers.ModelSerializer):    
     class Meta:
         model = User
-        fields = '__all__'
-        read_only_fields = ['id_user']
\ No newline at end of file
+        # token_version is auth bookkeeping (see User.save), not part of the API.
+        exclude = ['token_version']
+        read_only_fields = ['id_user']
+        # Accepted on create/update, never rendered: responses must not carry the password hash.
+        extra_kwargs = {'password': {'write_only': True}}
\ No newline at end of file
@@ -1,6 +1,9 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set
 from django.db.models import QuerySet
 from user.models import User
+from todo_project.pagination import KeysetPaginator
+from todo_project.count_cache import CountCache
+from todo_project.database import read_only
 
 
 class UserService:
@@ -10,11 +13,17 @@ class UserService:
         return User.objects.all()
     
     @staticmethod
-    def get_all_users(page: int = 1, page_size: int = 10) -> dict:
+    @read_only
+    def get_all_users(page: int = 1, page_size: int = 10, cursor: str = None, estimate_count: bool = False) -> dict:
         offset = (page - 1) * page_size
         queryset = User.objects.all().order_by('-id_user')
         
-        total_count = queryset.count()
+        if cursor is not None:
+            result = KeysetPaginator(('id_user',), descending=True).paginate(queryset, cursor, page_size)
+            result['page_size'] = page_size
+            return result
+        
+        total_count = CountCache.count('users', queryset, depends_on=('user',), estimate=estimate_count)
         users = list(queryset[offset:offset + page_size])
         
         return {
@@ -36,6 +45,11 @@ class UserService:
     def check_email_exists(email: str) -> bool:
         return User.objects.filter(email=email).exists()
     
+    @staticmethod
+    def existing_emails(emails: Iterable[str]) -> Set[str]:
+        """The subset of `emails` already taken, in a single `email__in` query."""
+        return set(User.objects.filter(email__in=list(emails)).values_list('email', flat=True))
+    
     @staticmethod
     def get_users_by_role(role: str = None) -> List[User]:
         queryset = User.objects.all()
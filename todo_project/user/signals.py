@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from ride.fragment_cache import RideFragmentCache
+from user.models import User
+from user.token_utils import TokenUtils
+from todo_project.count_cache import CountCache
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    CountCache.bump('user')
+    RideFragmentCache.invalidate('user', [instance.id_user])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    TokenUtils.forget_version(instance.id_user)
+    CountCache.bump('user')
+    RideFragmentCache.invalidate('user', [instance.id_user])
@@ -1,3 +1,162 @@
+import os
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+from django.core.cache import caches
+from django.core.management import call_command
 from django.test import TestCase
+from user.email_search import UserEmailSearch
+from user.models import User
+from user.token_utils import TokenUser, TokenUtils
 
-# Create your tests here.
+
+class TokenUtilsTests(TestCase):
+
+    def setUp(self):
+        # Cached token versions outlive the rolled-back users of earlier tests.
+        caches['default'].clear()
+        self.user = User.objects.create(
+            email='admin@example.com', first_name='Ada', last_name='Admin',
+            phone_number='', password='hash', role='admin'
+        )
+
+    def test_token_round_trip(self):
+        user = TokenUtils.get_user_from_token(TokenUtils.generate_token(self.user))
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual((user.id_user, user.role, user.email), (self.user.id_user, 'admin', 'admin@example.com'))
+
+    def test_tampered_token_is_rejected(self):
+        token = TokenUtils.generate_token(self.user)
+        self.assertIsNone(TokenUtils.get_user_from_token(token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')))
+        self.assertIsNone(TokenUtils.get_user_from_token('not-a-token'))
+
+    def test_token_expires(self):
+        token = TokenUtils.generate_token(self.user)
+        later = time.time() + TokenUtils.MAX_AGE.total_seconds() + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertIsNone(TokenUtils.get_user_from_token(token))
+
+    def test_role_change_revokes_older_tokens(self):
+        token = TokenUtils.generate_token(self.user)
+        self.user.role = 'user'
+        self.user.save()
+        self.assertIsNone(TokenUtils.get_user_from_token(token))
+        self.assertEqual(TokenUtils.get_user_from_token(TokenUtils.generate_token(self.user)).role, 'user')
+
+    def test_revocation_survives_cache_loss_and_stale_instances(self):
+        token = TokenUtils.generate_token(self.user)
+        # An instance loaded before the change must not write the old version back.
+        stale = User.objects.get(id_user=self.user.id_user)
+        self.user.set_password('new password')
+        self.user.save(update_fields=['password'])
+        caches['default'].clear()
+        stale.first_name = 'Ada L.'
+        stale.save()
+        self.assertIsNone(TokenUtils.get_user_from_token(token))
+
+    def test_other_changes_keep_tokens_valid(self):
+        token = TokenUtils.generate_token(self.user)
+        self.user.first_name = 'Ada L.'
+        self.user.save()
+        self.assertIsNotNone(TokenUtils.get_user_from_token(token))
+
+    def test_saving_a_deferred_instance_keeps_tokens_valid(self):
+        token = TokenUtils.generate_token(self.user)
+        user = User.objects.only('id_user', 'first_name').get(id_user=self.user.id_user)
+        user.first_name = 'Ada L.'
+        user.save()
+        self.assertIsNotNone(TokenUtils.get_user_from_token(token))
+        # Reading the deferred role loads it; saving it unchanged keeps the tokens too.
+        user = User.objects.defer('role').get(id_user=self.user.id_user)
+        self.assertEqual(user.role, 'admin')
+        user.save()
+        self.assertIsNotNone(TokenUtils.get_user_from_token(token))
+        self.assertEqual(User.objects.get(id_user=self.user.id_user).first_name, 'Ada L.')
+
+    def test_role_assigned_on_a_deferred_instance_revokes(self):
+        token = TokenUtils.generate_token(self.user)
+        user = User.objects.only('id_user').get(id_user=self.user.id_user)
+        user.role = 'user'
+        user.save(update_fields=['role'])
+        self.assertIsNone(TokenUtils.get_user_from_token(token))
+
+    def test_token_version_is_cached_between_requests(self):
+        token = TokenUtils.generate_token(self.user)
+        caches['default'].clear()
+        with self.assertNumQueries(1):
+            TokenUtils.get_user_from_token(token)
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(TokenUtils.get_user_from_token(token))
+
+    def test_deleted_user_and_explicit_revoke(self):
+        token = TokenUtils.generate_token(self.user)
+        TokenUtils.revoke(self.user.id_user)
+        self.assertIsNone(TokenUtils.get_user_from_token(token))
+        self.user.refresh_from_db()
+        token = TokenUtils.generate_token(self.user)
+        self.user.delete()
+        self.assertIsNone(TokenUtils.get_user_from_token(token))
+
+
+class UserEmailSearchTests(TestCase):
+
+    def test_trigram_index_follows_user_writes(self):
+        user = User.objects.create(
+            email='rita.rider@example.com', first_name='Rita', last_name='Rider',
+            phone_number='', password='hash', role='passenger'
+        )
+        def matches(term):
+            return set(User.objects.filter(id_user__in=UserEmailSearch.matching_user_ids(term)).values_list('email', flat=True))
+        self.assertEqual(matches('rider@'), {'rita.rider@example.com'})
+        self.assertEqual(matches('ri'), {'rita.rider@example.com'})
+        user.email = 'rita.r@example.com'
+        user.save()
+        self.assertEqual(matches('rider@'), set())
+        self.assertEqual(matches('ta.r@'), {'rita.r@example.com'})
+
+
+class ImportUsersTests(TestCase):
+
+    def setUp(self):
+        User.objects.create(
+            email='taken@example.com', first_name='Tess', last_name='Taken',
+            phone_number='', password='hash', role='passenger'
+        )
+        rows = [
+            'email,password,first_name,last_name,phone_number,role',
+            'new@example.com, secret1 ,Nina,New,5550100,driver',
+            'taken@example.com,secret2,Tess,Taken,,',
+            'short@example.com,abc,Sam,Short,,',
+            'new@example.com,secret3,Nina,Again,,',
+            'nameless@example.com,secret4,Noah,,,',
+            'plain@example.com,secret5,Pat,Plain,,',
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write('\n'.join(rows) + '\n')
+        self.path = f.name
+        self.addCleanup(os.unlink, self.path)
+
+    def import_users(self, **options):
+        out = StringIO()
+        call_command('import_users', self.path, workers=1, batch_size=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_dry_run_reports_without_creating(self):
+        output = self.import_users(dry_run=True)
+        self.assertIn('2 users would be created; 1 duplicates, 3 invalid rows.', output)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_creates_valid_rows_with_hashed_passwords(self):
+        output = self.import_users()
+        self.assertIn('line 3: taken@example.com already exists', output)
+        self.assertIn('line 4: password must be at least 6 characters long', output)
+        self.assertIn('line 5: new@example.com already appears on line 2', output)
+        self.assertIn('line 6: missing last_name', output)
+        self.assertIn('Import completed: 2 users created, 1 duplicates, 3 invalid rows.', output)
+
+        new = User.objects.get(email='new@example.com')
+        self.assertEqual((new.role, new.phone_number), ('driver', '5550100'))
+        self.assertTrue(new.check_password(' secret1 '))
+        self.assertEqual(User.objects.get(email='plain@example.com').role, 'user')
+        self.assertFalse(User.objects.filter(email__in=['short@example.com', 'nameless@example.com']).exists())
@@ -1,47 +1,109 @@
-import base64
-import json
-from datetime import datetime, timedelta
+from datetime import timedelta
 from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+
+class TokenUser:
+    """
+    Lightweight stand-in for a User built from a verified token.
+
+    `id_user`, `role` and `email` come from the token itself, so permission checks need no
+    query; any other attribute loads the real User row once on first access.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id_user, role, email):
+        self.id_user = id_user
+        self.pk = id_user
+        self.role = role
+        self.email = email
+        self._user = None
+
+    def get_user(self):
+        if self._user is None:
+            from user.models import User
+            self._user = User.objects.get(id_user=self.id_user)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get_user(), name)
+
+    def __str__(self):
+        return f"TokenUser #{self.id_user} ({self.email})"
 
 
 class TokenUtils:
-    
+    """
+    Signed, expiring auth tokens.
+
+    The token carries the user's id, role and email, so verifying it needs no full User row, plus
+    the user's `token_version`. Verification compares that version with the user's current one,
+    kept in the default cache next to the CountCache generations (one primary key lookup on a
+    miss): a role or password change (see User.save) or `revoke()` bumps the version, drops the
+    cached copy, and every token issued before it stops working, in every process and across
+    restarts. Deleting the user invalidates its tokens the same way.
+    """
+
+    SALT = 'user.token'
+    MAX_AGE = timedelta(days=7)
+    VERSION_KEY = 'token_version:{}'
+
     @staticmethod
     def generate_token(user):
         token_data = {
-            'email': user.email,
-            'role': user.role,
             'id_user': user.id_user,
-            'exp': (datetime.now() + timedelta(days=7)).timestamp()
+            'role': user.role,
+            'email': user.email,
+            'ver': user.token_version,
         }
-        token_json = json.dumps(token_data)
-        token_bytes = token_json.encode('utf-8')
-        token = base64.b64encode(token_bytes).decode('utf-8')
-        return token
-    
+        return signing.dumps(token_data, salt=TokenUtils.SALT, compress=True)
+
     @staticmethod
     def decode_token(token):
         try:
-            token_bytes = base64.b64decode(token.encode('utf-8'))
-            token_json = token_bytes.decode('utf-8')
-            token_data = json.loads(token_json)
-            
-            if datetime.now().timestamp() > token_data.get('exp', 0):
-                return None
-            
-            return token_data
-        except (ValueError, json.JSONDecodeError, UnicodeDecodeError):
+            return signing.loads(token, salt=TokenUtils.SALT, max_age=TokenUtils.MAX_AGE)
+        except (signing.BadSignature, ValueError, UnicodeDecodeError):
             return None
-    
+
+    @staticmethod
+    def revoke(id_user):
+        """Invalidate every token issued to this user so far."""
+        from user.models import User
+        User.objects.filter(id_user=id_user).update(token_version=F('token_version') + 1)
+        TokenUtils.forget_version(id_user)
+
+    @staticmethod
+    def forget_version(id_user):
+        """Drop the cached token version after a change; again on commit, in case a reader re-cached the old one."""
+        key = TokenUtils.VERSION_KEY.format(id_user)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+
+    @staticmethod
+    def current_version(id_user):
+        """The user's token version (-1 once deleted), from the cache when possible."""
+        key = TokenUtils.VERSION_KEY.format(id_user)
+        version = cache.get(key)
+        if version is None:
+            from user.models import User
+            version = User.objects.filter(id_user=id_user).values_list('token_version', flat=True).first()
+            version = -1 if version is None else version
+            cache.set(key, version, getattr(settings, 'TOKEN_VERSION_CACHE_TIMEOUT', 300))
+        return version
+
     @staticmethod
     def get_user_from_token(token):
         token_data = TokenUtils.decode_token(token)
-        if not token_data:
+        if not token_data or 'id_user' not in token_data or 'ver' not in token_data:
             return None
-        
-        from user.models import User
-        try:
-            user = User.objects.get(email=token_data.get('email'))
-            return user
-        except User.DoesNotExist:
+
+        if TokenUtils.current_version(token_data['id_user']) != token_data['ver']:
             return None
+        return TokenUser(token_data['id_user'], token_data.get('role'), token_data.get('email'))
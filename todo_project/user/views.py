@@ -7,6 +7,7 @@ from user.serializers import UserSerializer
 from user.permissions import IsAdminRole
 from user.services import UserService
 from user.token_utils import TokenUtils
+from todo_project.pagination import InvalidCursor, paginated_response_body
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -23,19 +24,22 @@ class UserViewSet(viewsets.ModelViewSet):
             page = 1
             page_size = 10
         
-        result = UserService.get_all_users(page=page, page_size=page_size)
+        try:
+            result = UserService.get_all_users(
+                page=page,
+                page_size=page_size,
+                cursor=request.query_params.get('cursor', None),
+                estimate_count=request.query_params.get('count') == 'estimated'
+            )
+        except InvalidCursor as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         data = [user.serialized for user in result['results']]
         
-        return Response({
-            'count': result['count'],
-            'page': result['page'],
-            'page_size': result['page_size'],
-            'total_pages': result['total_pages'],
-            'next': f"?page={page + 1}&page_size={page_size}" if page < result['total_pages'] else None,
-            'previous': f"?page={page - 1}&page_size={page_size}" if page > 1 else None,
-            'results': data
-        })
+        return Response(paginated_response_body(request.query_params, result, data))
 
     @action(detail=False, methods=['POST'], permission_classes=[AllowAny])
     def signin(self, request):